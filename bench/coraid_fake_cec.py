@@ -0,0 +1,39 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# coraid_fake_cec.py
+"""
+Runs check_coraid.py against fake_cec.py, for the benchmarks.
+
+check_coraid.py runs 'cec' as root under sudo, so the binary can't be
+chosen from its command line. This wrapper imports the plugin and points
+its CEC constant at the fake; options are the plugin's own.
+"""
+
+# Copyright 2026 agent <agent@local>
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import os
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import check_coraid
+
+
+if __name__ == '__main__':
+    check_coraid.CEC = os.path.join(BENCH_DIR, 'fake_cec.py')
+    check_coraid.main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# fake_cec.py
+"""
+Stand-in for the Coraid Ethernet Console, for the benchmarks.
+
+Called like the real one ('fake_cec.py -s0 -ee eth0'), it puts its
+terminal in raw mode and talks just enough of the protocol for
+check_coraid.py: a banner, the 'SR shelfN>' prompt, 'show -l', 'list -l',
+and Ctrl-e followed by 'q' to quit.
+
+Knobs, from the environment (pexpect passes it along):
+
+  FAKE_CEC_LATENCY   seconds to wait before every prompt (default: 0)
+  FAKE_CEC_TRICKLE   seconds to wait between output lines (default: 0)
+  FAKE_CEC_LINES     lines of output of each command (default: 10)
+"""
+
+# Copyright 2026 agent <agent@local>
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import os
+import sys
+import time
+import tty
+from optparse import OptionParser
+
+
+LATENCY = float(os.environ.get('FAKE_CEC_LATENCY', 0))
+TRICKLE = float(os.environ.get('FAKE_CEC_TRICKLE', 0))
+LINES = int(os.environ.get('FAKE_CEC_LINES', 10))
+
+
+def write(text):
+    """Writes to the terminal, with the CR/LF a raw terminal needs.
+    """
+    os.write(1, text.replace('\n', '\r\n').encode('ascii'))
+
+
+def command_output(shelf, command):
+    """Lines answering 'show -l' or 'list -l'.
+    """
+    if command == 'show -l':
+        return ["%s.%d  up  %dGB  raid5" % (shelf, i, 500 + i)
+                for i in range(LINES)]
+    return ["%s.%d  disk%d  ok" % (shelf, i, i) for i in range(LINES)]
+
+
+def main():
+    parser = OptionParser()
+    parser.add_option("-s", dest="shelf", default='0')
+    parser.add_option("-e", dest="escape", default='e')
+    opts, args = parser.parse_args()
+
+    if os.isatty(0):
+        tty.setraw(0)
+    prompt = "SR shelf %s> " % opts.shelf
+
+    time.sleep(LATENCY)
+    write("Probing for shelves... shelf %s found.\n" % opts.shelf)
+    write("connecting... done.\nEscape is Ctrl-e\n")
+
+    line = ''
+    escaped = False
+    while True:
+        char = os.read(0, 1).decode('ascii', 'replace')
+        if not char:
+            return 0
+        if escaped:
+            if char == 'q':
+                write("\n")
+                return 0
+            continue
+        if char == '\x05':
+            escaped = True
+            write("\n>>> ")
+        elif char in '\r\n':
+            write("\n")
+            if line in ('show -l', 'list -l'):
+                for output_line in command_output(opts.shelf, line):
+                    write(output_line + "\n")
+                    time.sleep(TRICKLE)
+            time.sleep(LATENCY)
+            write(prompt)
+            line = ''
+        else:
+            # Echo, as the real console does.
+            write(char)
+            line += char
+
+
+if __name__ == '__main__':
+    sys.exit(main())
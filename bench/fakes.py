@@ -0,0 +1,249 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# fakes.py
+"""
+In-process stand-ins for the services checked by the plugins, for the
+benchmarks in run_bench.py.
+
+  FakeGearmand      admin port: answers 'status' with 'size' queues
+  FakeZookeeper     four letter words: ruok, isro, mntr ('size' extra keys)
+  FakeRabbitMQ      management API: /api/overview ('size' bytes of padding)
+
+Every fake takes the same knobs:
+
+  latency     seconds to wait before answering a request
+  read_delay  seconds to wait before reading a request (a slow peer)
+  trickle     seconds to wait between chunks of the answer
+  chunk       bytes per chunk when trickling
+  size        payload size (queues, keys or bytes, see above)
+
+Servers listen on 127.0.0.1, on a free port (see the 'port' attribute),
+and serve from a background thread until stop() is called.
+
+The 'cec' console is faked by fake_cec.py, which the plugin spawns on a
+pty like the real one.
+"""
+
+# Copyright 2026 agent <agent@local>
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import json
+import time
+import socket
+import threading
+
+try:
+    import SocketServer as socketserver
+    from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+except ImportError:
+    import socketserver
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+
+
+class FakeServer:
+    """Threaded TCP server with latency knobs. Subclasses define answer().
+    """
+
+    # Whether the server hangs up after every answer.
+    close_after_answer = False
+
+    def __init__(self, latency=0, read_delay=0, trickle=0, chunk=512,
+                 size=10):
+        self.latency = latency
+        self.read_delay = read_delay
+        self.trickle = trickle
+        self.chunk = chunk
+        self.size = size
+        self.server = self.make_server()
+        self.server.daemon_threads = True
+        self.server.fake = self
+        self.port = self.server.server_address[1]
+        self.thread = None
+
+
+    def make_server(self):
+        """Returns the socketserver instance, bound to a free port.
+        """
+        return ThreadingTCPServer(('127.0.0.1', 0), FakeHandler)
+
+
+    def start(self):
+        """Serves on a daemon thread. Returns self.
+        """
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+
+    def stop(self):
+        """Stops serving and closes the listening socket.
+        """
+        self.server.shutdown()
+        self.server.server_close()
+
+
+    def send(self, sock, data):
+        """Sends data after 'latency', trickling it if asked to.
+        """
+        time.sleep(self.latency)
+        if not self.trickle:
+            sock.sendall(data)
+            return
+        for start in range(0, len(data), self.chunk):
+            sock.sendall(data[start:start + self.chunk])
+            time.sleep(self.trickle)
+
+
+    def handle(self, sock):
+        """Serves a connection: one answer per request line.
+        """
+        reader = sock.makefile('rb')
+        while True:
+            time.sleep(self.read_delay)
+            line = reader.readline()
+            if not line:
+                break
+            data = self.answer(line.strip().decode('ascii', 'replace'))
+            if data is None:
+                break
+            self.send(sock, data)
+            if self.close_after_answer:
+                break
+        reader.close()
+
+
+    def answer(self, request):
+        """Returns the bytes answering 'request', or None to hang up.
+        """
+        raise NotImplementedError
+
+
+
+class ThreadingTCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    allow_reuse_address = True
+
+
+class FakeHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        try:
+            self.server.fake.handle(self.request)
+        except socket.error:
+            # Clients going away mid-answer is part of the game.
+            pass
+
+
+
+class FakeGearmand(FakeServer):
+    """Gearmand admin protocol; keeps the connection open like gearmand.
+    """
+
+    def answer(self, request):
+        if request != 'status':
+            return b'ERR UNKNOWN_COMMAND\n'
+        lines = ["queue%d\t%d\t0\t%d\n" % (i, i % 50, i % 5)
+                 for i in range(self.size)]
+        return (''.join(lines) + '.\n').encode('ascii')
+
+
+
+class FakeZookeeper(FakeServer):
+    """Zookeeper four letter words; hangs up after every answer.
+    """
+
+    close_after_answer = True
+
+    def __init__(self, state='leader', **kwargs):
+        FakeServer.__init__(self, **kwargs)
+        self.state = state
+
+
+    def answer(self, request):
+        if request == 'ruok':
+            return b'imok'
+        if request == 'isro':
+            return b'rw'
+        if request == 'mntr':
+            lines = ["zk_version\t3.4.6-1569965\n",
+                     "zk_server_state\t%s\n" % self.state]
+            lines += ["zk_fake_key_%d\t%d\n" % (i, i)
+                      for i in range(self.size)]
+            return ''.join(lines).encode('ascii')
+        return b''
+
+
+
+class FakeRabbitMQ(FakeServer):
+    """RabbitMQ management API: just /api/overview.
+    """
+
+    def __init__(self, avg_rate=1.5, **kwargs):
+        self.avg_rate = avg_rate
+        FakeServer.__init__(self, **kwargs)
+
+
+    def make_server(self):
+        return ThreadingHTTPServer(('127.0.0.1', 0), FakeRabbitMQHandler)
+
+
+    def overview(self):
+        """Body of /api/overview, padded up to 'size' bytes.
+        """
+        body = {
+            'message_stats': {
+                'deliver_get_details': {'avg_rate': self.avg_rate},
+            },
+            'padding': 'x' * self.size,
+        }
+        return json.dumps(body).encode('ascii')
+
+
+
+class ThreadingHTTPServer(socketserver.ThreadingMixIn, HTTPServer):
+    allow_reuse_address = True
+
+
+class FakeRabbitMQHandler(BaseHTTPRequestHandler):
+    def handle(self):
+        # Before the request line is parsed: a slow peer.
+        time.sleep(self.server.fake.read_delay)
+        BaseHTTPRequestHandler.handle(self)
+
+    def do_GET(self):
+        fake = self.server.fake
+        if not self.path.startswith('/api/overview'):
+            self.send_error(404)
+            return
+        body = fake.overview()
+        time.sleep(fake.latency)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        try:
+            if fake.trickle:
+                for start in range(0, len(body), fake.chunk):
+                    self.wfile.write(body[start:start + fake.chunk])
+                    self.wfile.flush()
+                    time.sleep(fake.trickle)
+            else:
+                self.wfile.write(body)
+        except socket.error:
+            pass
+
+    def log_message(self, format, *args):
+        # Keep the benchmark report clean.
+        pass
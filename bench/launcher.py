@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# launcher.py
+"""
+Spawns plugins for run_bench.py and reports what they cost.
+
+Linux carries the peak RSS of a process over to the programs it execs,
+so a plugin spawned straight from the harness reports the harness' peak
+RSS whenever it's bigger. This launcher is a tiny process that spawns the
+plugins instead, so figures belong to the plugins.
+
+Protocol, on stdin/stdout: one command per line, arguments separated by
+NULs; every command is answered with a line
+
+    wall_s cpu_s max_rss_kb exit_code hex_encoded_output
+"""
+
+# Copyright 2026 agent <agent@local>
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import os
+import sys
+import time
+import binascii
+
+
+def spawn(cmd):
+    """Runs cmd. Returns (wall_s, cpu_s, max_rss_kb, exit_code, output).
+    """
+    started = time.time()
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.dup2(write_fd, 1)
+        os.dup2(write_fd, 2)
+        os.close(read_fd)
+        os.close(write_fd)
+        try:
+            os.execv(cmd[0], cmd)
+        finally:
+            os._exit(127)
+
+    os.close(write_fd)
+    chunks = []
+    while True:
+        data = os.read(read_fd, 65536)
+        if not data:
+            break
+        chunks.append(data)
+    os.close(read_fd)
+    pid, status, usage = os.wait4(pid, 0)
+    return (time.time() - started, usage.ru_utime + usage.ru_stime,
+            usage.ru_maxrss, os.WEXITSTATUS(status), b''.join(chunks))
+
+
+def main():
+    for line in iter(sys.stdin.readline, ''):
+        wall, cpu, max_rss, code, output = spawn(line.rstrip('\n').split('\0'))
+        sys.stdout.write("%f %f %d %d %s\n" % (
+            wall, cpu, max_rss, code, binascii.hexlify(output).decode('ascii')))
+        sys.stdout.flush()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,372 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# run_bench.py
+"""
+Load-testing benchmark for the plugins, against the fakes in fakes.py
+and fake_cec.py.
+
+Runs every plugin many times, some runs at once, and reports for each one
+the wall time (p50 and p99), the CPU time (user + system, mean) and the
+peak RSS of the plugin process. Results can be saved as a baseline and
+later runs compared against it, so regressions show up as diffs:
+
+    bench/run_bench.py --save before
+    ...change something...
+    bench/run_bench.py --compare before
+
+Plugins run with the interpreter given by --python, so they need their
+own dependencies (pynag, requests, pexpect) there. check_coraid.py runs
+'cec' with sudo unless it's root. Every plugin gets an empty negative
+cache of its own (NAGIOS_NEGCACHE_DIR), removed when it's done.
+"""
+
+# Copyright 2026 agent <agent@local>
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import os
+import sys
+import json
+import math
+import binascii
+import shutil
+import tempfile
+import threading
+import subprocess
+from timeit import default_timer
+from optparse import OptionParser
+
+from fakes import FakeGearmand, FakeZookeeper, FakeRabbitMQ
+
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PLUGIN_DIR = os.path.dirname(BENCH_DIR)
+BASELINE_DIR = os.path.join(BENCH_DIR, 'baselines')
+
+PLUGINS = ['gearmand', 'zookeeper', 'rabbitmq', 'coraid']
+# Metrics compared against baselines; for all of them, lower is better.
+METRICS = ['p50_ms', 'p99_ms', 'cpu_ms', 'max_rss_kb']
+
+
+def parse_command_line():
+    """Optparse wrapper.
+    """
+    usage = "usage: %prog [options] [" + '|'.join(PLUGINS) + "]..."
+    parser = OptionParser(usage=usage)
+    parser.add_option("-n", "--runs", type="int", default=50,
+                      help="runs of every plugin (default: 50)")
+    parser.add_option("-c", "--concurrency", type="int", default=4,
+                      help="runs at the same time (default: 4)")
+    parser.add_option("--python", default=sys.executable,
+                      help="interpreter for the plugins (default: %default)")
+    parser.add_option("--latency", type="float", default=0,
+                      help="seconds before every answer (default: 0)")
+    parser.add_option("--read-delay", type="float", default=0,
+                      help="seconds before reading every request (default: 0)")
+    parser.add_option("--trickle", type="float", default=0,
+                      help="seconds between chunks of an answer (default: 0)")
+    parser.add_option("--chunk", type="int", default=512,
+                      help="bytes per chunk when trickling (default: 512)")
+    parser.add_option("--size", type="int", default=10,
+                      help="payload size: queues, keys, bytes or lines "
+                           "(default: 10)")
+    parser.add_option("--save", metavar="NAME",
+                      help="save results as baseline NAME")
+    parser.add_option("--compare", metavar="NAME",
+                      help="compare results with baseline NAME")
+    parser.add_option("--tolerance", type="float", default=20,
+                      help="%% over the baseline counted as a regression "
+                           "(default: 20)")
+
+    options, args = parser.parse_args()
+    for plugin in args:
+        if plugin not in PLUGINS:
+            parser.error("unknown plugin '%s'" % plugin)
+    return options, args or PLUGINS
+
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers.
+    """
+    ordered = sorted(values)
+    rank = int(math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[max(rank, 1) - 1]
+
+
+class Launcher:
+    """Runs plugins through launcher.py, one at a time.
+    """
+
+    def __init__(self, python, env):
+        # '-S': skip site imports, the launcher must stay small.
+        self.proc = subprocess.Popen(
+            [python, '-S', os.path.join(BENCH_DIR, 'launcher.py')],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, env=env)
+
+
+    def run(self, cmd):
+        """Runs a plugin. Returns (wall_s, cpu_s, max_rss_kb, exit_code,
+        output).
+        """
+        self.proc.stdin.write(('\0'.join(cmd) + '\n').encode('utf-8'))
+        self.proc.stdin.flush()
+        fields = self.proc.stdout.readline().decode('ascii').split(' ')
+        output = binascii.unhexlify(fields[4].strip())
+        return (float(fields[0]), float(fields[1]), int(fields[2]),
+                int(fields[3]), output.decode('utf-8', 'replace').strip())
+
+
+    def close(self):
+        self.proc.stdin.close()
+        self.proc.wait()
+
+
+
+def run_many(cmd, env, python, runs, concurrency):
+    """Runs a plugin 'runs' times, 'concurrency' at once. Returns a list
+    of Launcher.run() results.
+    """
+    results = []
+    lock = threading.Lock()
+    pending = [runs]
+
+    def worker():
+        launcher = Launcher(python, env)
+        while True:
+            lock.acquire()
+            if not pending[0]:
+                lock.release()
+                break
+            pending[0] -= 1
+            lock.release()
+            result = launcher.run(cmd)
+            lock.acquire()
+            results.append(result)
+            lock.release()
+        launcher.close()
+
+    threads = [threading.Thread(target=worker) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def summarize(results):
+    """Turns Launcher.run() results into the figures of the report.
+
+    Figures only count successful runs: a plugin crashing early must not
+    look faster. With no successful run, they're all None.
+    """
+    passed = [r for r in results if r[3] == 0]
+    failed = [r for r in results if r[3] != 0]
+    summary = {
+        'runs': len(results),
+        'errors': len(failed),
+        'p50_ms': None,
+        'p99_ms': None,
+        'cpu_ms': None,
+        'max_rss_kb': None,
+    }
+    if passed:
+        walls = [r[0] for r in passed]
+        summary.update({
+            'p50_ms': round(percentile(walls, 50) * 1000, 2),
+            'p99_ms': round(percentile(walls, 99) * 1000, 2),
+            'cpu_ms': round(sum([r[1] for r in passed]) / len(passed) * 1000, 2),
+            'max_rss_kb': max([r[2] for r in passed]),
+        })
+    if failed:
+        summary['sample_error'] = failed[0][4]
+    return summary
+
+
+
+def plugin_command(plugin, opts, port, workdir):
+    """Command line of a plugin, pointed at its fake.
+    """
+    if plugin == 'gearmand':
+        return [opts.python, os.path.join(PLUGIN_DIR, 'check_gearmand_jobs.py'),
+                '-H', '127.0.0.1', '-p', str(port), '-q', 'queue0',
+                '-w', '1000000']
+    if plugin == 'zookeeper':
+        return [opts.python, os.path.join(PLUGIN_DIR, 'check_zookeeper.py'),
+                '-H', '127.0.0.1', '-p', str(port)]
+    if plugin == 'rabbitmq':
+        return [opts.python, os.path.join(PLUGIN_DIR, 'check_rabbitmq_metrics.py'),
+                '-H', '127.0.0.1', '-P', str(port)]
+    if plugin == 'coraid':
+        return [opts.python, os.path.join(BENCH_DIR, 'coraid_fake_cec.py'),
+                '--basedir', workdir, '--shelf', '0', '--interface', 'lo']
+
+
+def start_fake(plugin, opts):
+    """Starts the fake server for a plugin. Returns it, or None for 'cec'.
+    """
+    knobs = dict(latency=opts.latency, read_delay=opts.read_delay,
+                 trickle=opts.trickle, chunk=opts.chunk, size=opts.size)
+    fakes = {
+        'gearmand': FakeGearmand,
+        'zookeeper': FakeZookeeper,
+        'rabbitmq': FakeRabbitMQ,
+    }
+    if plugin not in fakes:
+        return None
+    return fakes[plugin](**knobs).start()
+
+
+def bench_plugin(plugin, opts):
+    """Benchmarks a plugin against its fake. Returns summarize() figures.
+    """
+    env = dict(os.environ)
+    env['FAKE_CEC_LATENCY'] = str(opts.latency)
+    env['FAKE_CEC_TRICKLE'] = str(opts.trickle)
+    env['FAKE_CEC_LINES'] = str(opts.size)
+
+    fake = start_fake(plugin, opts)
+    workdir = tempfile.mkdtemp(prefix='bench_')
+    # A private negative cache per plugin: runs must neither read nor leave
+    # backoffs in the one the real checks use.
+    env['NAGIOS_NEGCACHE_DIR'] = os.path.join(workdir, 'negcache')
+    try:
+        port = fake and fake.port
+        cmd = plugin_command(plugin, opts, port, workdir)
+        launcher = Launcher(opts.python, env)
+        if plugin == 'coraid':
+            # Baseline file for the shelf, as an admin would do.
+            launcher.run(cmd + ['--create'])
+        # Warm up caches, so the first run doesn't skew the figures.
+        launcher.run(cmd)
+        launcher.close()
+        return summarize(run_many(cmd, env, opts.python, opts.runs,
+                                  opts.concurrency))
+    finally:
+        if fake:
+            fake.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+
+def figure(value):
+    """Formats a figure of the report; '-' when there is none.
+    """
+    if value is None:
+        return '-'
+    return "%.2f" % value
+
+
+def print_report(results):
+    """Prints a table with the figures of every plugin.
+    """
+    print("%-10s %6s %6s %10s %10s %10s %12s" % (
+        'plugin', 'runs', 'errors', 'p50_ms', 'p99_ms', 'cpu_ms', 'max_rss_kb'))
+    for plugin in PLUGINS:
+        if plugin not in results:
+            continue
+        r = results[plugin]
+        print("%-10s %6d %6d %10s %10s %10s %12s" % (
+            plugin, r['runs'], r['errors'], figure(r['p50_ms']),
+            figure(r['p99_ms']), figure(r['cpu_ms']),
+            r['max_rss_kb'] is None and '-' or r['max_rss_kb']))
+    for plugin in PLUGINS:
+        if 'sample_error' in results.get(plugin, {}):
+            print("%s failed, e.g.: %s" % (plugin,
+                                           results[plugin]['sample_error']))
+
+
+def compare(results, baseline, tolerance):
+    """Prints the changes against a baseline. Returns the regressions.
+
+    Any error is a regression; figures are only compared when both runs
+    have them.
+    """
+    regressions = []
+    print("\n%-10s %-10s %10s %10s %8s" % (
+        'plugin', 'metric', 'baseline', 'now', 'change'))
+    for plugin in PLUGINS:
+        if plugin not in results or plugin not in baseline:
+            continue
+        before = baseline[plugin]['errors']
+        now = results[plugin]['errors']
+        flag = ''
+        if now:
+            flag = '  REGRESSION'
+            regressions.append((plugin, 'errors'))
+        print("%-10s %-10s %10d %10d %8s%s" % (
+            plugin, 'errors', before, now, '', flag))
+        for metric in METRICS:
+            before = baseline[plugin][metric]
+            now = results[plugin][metric]
+            if before is None or now is None:
+                print("%-10s %-10s %10s %10s" % (
+                    plugin, metric, figure(before), figure(now)))
+                continue
+            if before:
+                change = (now - before) * 100.0 / before
+            else:
+                change = 0.0
+            flag = ''
+            if change > tolerance:
+                flag = '  REGRESSION'
+                regressions.append((plugin, metric))
+            print("%-10s %-10s %10.2f %10.2f %+7.1f%%%s" % (
+                plugin, metric, before, now, change, flag))
+    return regressions
+
+
+
+def main():
+    """Runs unless imported.
+    """
+    opts, plugins = parse_command_line()
+
+    results = {}
+    for plugin in plugins:
+        results[plugin] = bench_plugin(plugin, opts)
+    print_report(results)
+
+    params = dict(runs=opts.runs, concurrency=opts.concurrency,
+                  latency=opts.latency, read_delay=opts.read_delay,
+                  trickle=opts.trickle, chunk=opts.chunk, size=opts.size)
+
+    failed = [plugin for plugin in plugins if results[plugin]['errors']]
+
+    if opts.save and failed:
+        print("\nNot saving baseline '%s': %s had errors" % (
+            opts.save, ', '.join(failed)))
+    elif opts.save:
+        if not os.path.isdir(BASELINE_DIR):
+            os.makedirs(BASELINE_DIR)
+        baseline_file = open(os.path.join(BASELINE_DIR, opts.save + '.json'), 'w')
+        json.dump({'params': params, 'results': results}, baseline_file,
+                  indent=2, sort_keys=True)
+        baseline_file.close()
+
+    if opts.compare:
+        saved = json.load(open(os.path.join(BASELINE_DIR, opts.compare + '.json')))
+        if saved['params'] != params:
+            print("\nWarning: baseline '%s' was run with %s" % (
+                opts.compare, saved['params']))
+        if compare(results, saved['results'], opts.tolerance):
+            return 1
+    if failed:
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -49,8 +49,11 @@ import pexpect
 import StringIO
 import sys
 import os
+import atexit
 from optparse import OptionParser
 import logging
+from nagios_passive import PassiveResults, add_passive_options, STATUS_TEXT
+from nagios_timing import PhaseTimer, add_timing_options, start_profiler
 
 # Full path of the 'cec' binary.
 CEC = '/usr/local/bin/cec'
@@ -64,8 +67,9 @@ def parse_command_line ():
 
     usage = "usage: %prog <options>"
     parser = OptionParser(usage=usage)
-    parser.add_option("-s", "--shelf", action="store", default=0,
-                      help="number of the shelf (default: 0)")
+    parser.add_option("-s", "--shelf", action="store", default='0',
+                      help="number of the shelf (default: 0); "
+                           "comma-separated list in passive mode")
     parser.add_option("-i", "--interface", action="store", default='eth0',
                       help="interface to bind (default: eth0)")
     parser.add_option("-b", "--basedir", action="store",
@@ -77,6 +81,8 @@ def parse_command_line ():
                       help="create initial baseline file",)
     parser.add_option("-d", "--debug", action="store_true", default=False,
                       help="show debugging info")
+    add_passive_options(parser, "AoE shelf%s")
+    add_timing_options(parser)
 
     options, args = parser.parse_args()
 
@@ -84,6 +90,24 @@ def parse_command_line ():
 
 
 
+def drop_privileges():
+    """Under sudo, turns into the calling user for good.
+
+    'cec' needs root, but files named on the command line (passive results,
+    profiles) must be written with the rights of the caller.
+    """
+    if os.getuid() != 0 or 'SUDO_UID' not in os.environ:
+        return
+    uid = int(os.environ['SUDO_UID'])
+    gid = int(os.environ['SUDO_GID'])
+    if 'SUDO_USER' in os.environ:
+        os.initgroups(os.environ['SUDO_USER'], gid)
+    else:
+        os.setgroups([])
+    os.setgid(gid)
+    os.setuid(uid)
+
+
 def nagios_ok(msg):
     """Outputs OK message in Nagios format and exits.
     """
@@ -103,11 +127,12 @@ def nagios_unknown(msg):
     sys.exit(3)
 
 
-def cec_expect(shelf, interface):
+def cec_expect(shelf, interface, timer=None):
     """Runs commands 'show -l' and 'list -l' on a Coraid console.
     
     @shelf: number of the shelf
     @interface: interface to bind
+    @timer: nagios_timing.PhaseTimer to charge every phase to
     
     Uses the pexpect module to send commands and retrieve output.
     """
@@ -127,13 +152,19 @@ def cec_expect(shelf, interface):
     # File-like object to write pexpect output.
     output = StringIO.StringIO()
 
+    if timer is None:
+        timer = PhaseTimer()
+    timer.mark()
     child = pexpect.spawn(cec_cmd, timeout=CEC_TIMEOUT)
+    timer.lap('spawn')
     try:
         child.expect("Escape is Ctrl-e")
+        timer.lap('connect')
         child.sendline("")
         child.sendline("")
         child.sendline("")
         child.expect("SR shelf(.*)>")
+        timer.lap('prompt')
         
         child.logfile = output
         
@@ -143,6 +174,7 @@ def cec_expect(shelf, interface):
         child.sendline("")
         child.sendline("")
         child.expect("SR shelf(.*)>")
+        timer.lap('show')
     
         # Run 'list -l'
         child.sendline("")
@@ -153,6 +185,7 @@ def cec_expect(shelf, interface):
         child.sendline("")
         child.sendline("")
         child.expect("SR shelf(.*)>")
+        timer.lap('list')
         
         # Stop capturing output.
         child.logfile = None
@@ -163,10 +196,14 @@ def cec_expect(shelf, interface):
         child.send("q\r")
         child.expect(pexpect.EOF)
         child.close()
+        timer.lap('disconnect')
     except (pexpect.TIMEOUT, pexpect.EOF):
         child.close(force=True)
         
-    return cec_normalize(output.getvalue())
+    timer.mark()
+    output = cec_normalize(output.getvalue())
+    timer.lap('parse')
+    return output
 
 
 
@@ -219,6 +256,54 @@ def create_baseline(baseline_fname, contents):
 
 
 
+def check_shelf(shelf, interface, basedir, timer=None):
+    """Compares the current status of a shelf with its baseline file.
+
+    Returns (return_code, message) instead of exiting, so many shelves can
+    be checked on a single run.
+    """
+    if timer is None:
+        timer = PhaseTimer()
+    baseline_fname = os.path.join(basedir, 'shelf%s.baseline' % shelf)
+    try:
+        baseline = open(baseline_fname).read()
+    except IOError:
+        return (3, "cannot open %s. Run the plugin with --create for "
+                   "initialization." % baseline_fname)
+
+    try:
+        output = cec_expect(shelf, interface, timer)
+    except pexpect.TIMEOUT:
+        return (2, "AoE shelf%s not responding" % shelf)
+
+    timer.mark()
+    if baseline == output:
+        result = (0, "AoE shelf%s looks as usual" % shelf)
+    else:
+        result = (2, "AoE shelf%s has changes" % shelf)
+    timer.lap('eval')
+    return result
+
+
+
+def check_passive(opts):
+    """Checks every shelf in --shelf and submits them as passive results.
+    """
+    # Shelves are reached through the local interface: default to this host.
+    passive = PassiveResults.from_options(opts, os.uname()[1])
+    for shelf in opts.shelf.split(','):
+        timer = PhaseTimer()
+        if os.path.isfile(CEC):
+            code, msg = check_shelf(shelf, opts.interface, opts.basedir, timer)
+        else:
+            code, msg = 3, "%s not found" % CEC
+        passive.add(shelf, code, "%s: %s" % (STATUS_TEXT[code], msg),
+                    perfdata=timer.perfdata())
+    drop_privileges()
+    passive.submit_and_exit()
+
+
+
 def main():
     """Runs unless the file is imported.
     """
@@ -230,6 +315,14 @@ def main():
         logging.basicConfig(level=logging.DEBUG)
     else:
         logging.basicConfig(level=logging.INFO)
+    if opts.profile_dir:
+        start_profiler(opts.profile_dir)
+        # atexit runs last in, first out: privileges go before the dump.
+        atexit.register(drop_privileges)
+
+    if not opts.create and not opts.show \
+            and (opts.command_file or opts.spool_dir):
+        check_passive(opts)
 
     baseline_fname = os.path.join(opts.basedir, 
         'shelf%s.baseline' % opts.shelf)
@@ -241,10 +334,12 @@ def main():
     if not os.path.isfile(CEC):
         nagios_unknown("%s not found" % CEC)
 
+    timer = PhaseTimer()
     try:
-        output = cec_expect(opts.shelf, opts.interface)
+        output = cec_expect(opts.shelf, opts.interface, timer)
     except pexpect.TIMEOUT:
-        nagios_critical("AoE shelf%s not responding" % opts.shelf)
+        nagios_critical("AoE shelf%s not responding | %s"
+                        % (opts.shelf, timer.perfdata()))
 
     if opts.create:
         create_baseline(baseline_fname, output)
@@ -254,10 +349,15 @@ def main():
         print output
         sys.exit()
         
-    if baseline == output:
-        nagios_ok("AoE shelf%s looks as usual" % opts.shelf)
+    timer.mark()
+    unchanged = (baseline == output)
+    timer.lap('eval')
+    if unchanged:
+        nagios_ok("AoE shelf%s looks as usual | %s"
+                  % (opts.shelf, timer.perfdata()))
     else:
-        nagios_critical("AoE shelf%s has changes" % opts.shelf)
+        nagios_critical("AoE shelf%s has changes | %s"
+                        % (opts.shelf, timer.perfdata()))
 
 
 if __name__ == '__main__':
@@ -23,13 +23,24 @@ Nagios plugin, checks the number of jobs in a Gearman queue.
 
 
 import sys
-import telnetlib
 import socket
 import os
+import select
 from optparse import OptionParser
+from timeit import default_timer
+from nagios_passive import PassiveResults, add_passive_options
+from nagios_negcache import NegativeCache, TargetBackoff
+from nagios_timing import PhaseTimer, add_timing_options, start_profiler, \
+        connect_telnet
 
 
 DEBUG_MOCK_GEARMAND = False
+# Seconds to wait for the TCP connection to Gearmand.
+CONNECT_TIMEOUT = 3
+# Seconds to wait for the whole answer to 'status', unless -t is given.
+READ_TIMEOUT = 0.5
+# Last line of the answer to 'status'.
+STATUS_END = r'(^|\n)\.\r?\n'
 
 
 ############################################################
@@ -95,13 +106,14 @@ class Plugin:
         self.parser.add_option("-H", "--host", dest="host", 
                 help="Target Host", metavar="HOST")
         self.parser.add_option("-t", "--timeout", dest="timeout", 
-                help="Connection Timeout", metavar="TIMEOUT")
+                help="Connection and answer timeout", metavar="TIMEOUT")
         self.parser.add_option("-c", "--critical", dest="critical", 
                 help="Critical Threshhold", metavar="CRITICAL")
         self.parser.add_option("-w", "--warning", dest="warning", 
                 help="Warn Threshhold", metavar="WARNING")
 
         (options, args) = self.parser.parse_args()
+        self.opts = options
 
         ## Set verbosity level
         if int(options.verbose) in (0, 1, 2, 3):
@@ -162,14 +174,23 @@ class Plugin:
         10:20   < 10 or > 20, (outside the range of {10 .. 20})
         @10:20  # 10 and # 20, (inside the range of {10 .. 20})
         """
+        self.nagios_exit(*self.evaluate_range(value))
+
+
+
+    def evaluate_range(self, value):
+        """
+        Same as check_range(), but returns (code_text, message) instead of
+        exiting. Used to check several values on a single run.
+        """
         critical = self.data['critical']
         warning = self.data['warning']
 
         if critical and self._range_checker(value, critical):
-            self.nagios_exit("CRITICAL","%s meets the range: %s" % (value, self.hr_range))
+            return ("CRITICAL","%s meets the range: %s" % (value, self.hr_range))
 
         if warning and self._range_checker(value, warning):
-            self.nagios_exit("WARNING","%s meets the range: %s" % (value, self.hr_range))
+            return ("WARNING","%s meets the range: %s" % (value, self.hr_range))
 
         ## This is the lowest range, which we'll output
         if warning:
@@ -177,7 +198,7 @@ class Plugin:
         else:
             alert_range = critical
         
-        self.nagios_exit("OK","%s does not meet the range: %s" % (value, self.hr_range))
+        return ("OK","%s does not meet the range: %s" % (value, self.hr_range))
 
 
 
@@ -238,10 +259,12 @@ class Plugin:
 
 
 
-    def nagios_exit(self, code_text, message):
+    def nagios_exit(self, code_text, message, perfdata=None):
         """
         Exit with exit_code, message, and optionally perfdata
         """
+        if perfdata:
+            message = "%s | %s" % (message, perfdata)
         ## This should be one line (or more in nagios 3)
         print "%s : %s" % (code_text, message)
         sys.exit(self.errors[code_text])
@@ -266,14 +289,49 @@ def parse_gearmand_status(raw_status):
 
 
 
-def get_gearmand_status(host='localhost', port=4730, timeout=0.5):
+class NoAnswer(socket.timeout):
+    """Gearmand took the connection but its status didn't arrive in time.
+    """
+
+
+
+def get_gearmand_status(host='localhost', port=4730, timeout=READ_TIMEOUT,
+        connect_timeout=CONNECT_TIMEOUT, cache=None, timer=None):
     """Connects to 'port' and retrieves the 'status' of Gearmand.
+
+    Targets that failed recently raise TargetBackoff without connecting,
+    see nagios_negcache. Status not read in 'timeout' seconds raises
+    NoAnswer. Phases are timed on 'timer', see nagios_timing.
     """
-    client = telnetlib.Telnet(host, port)
-    client.write('status\n')
-    raw_status = client.expect(['^.$'], timeout)
-    client.close()
-    return raw_status[2]
+    if cache is None:
+        cache = NegativeCache()
+    if timer is None:
+        timer = PhaseTimer()
+    cache.check(host, port)
+    timer.mark()
+    try:
+        client = connect_telnet(host, port, connect_timeout, timer)
+        client.write('status\n')
+        # 'timeout' covers the whole answer: select() and expect() share it.
+        deadline = default_timer() + timeout
+        readable = select.select([client.get_socket()], [], [], timeout)[0]
+        timer.lap('ttfb')
+        if not readable:
+            client.close()
+            raise NoAnswer("nothing received in %ss" % timeout)
+        # The status ends with a line holding a single dot.
+        index, ___, raw_status = client.expect([STATUS_END],
+                max(deadline - default_timer(), 0))
+        client.close()
+        timer.lap('read')
+        if index == -1:
+            # No terminator: a truncated status isn't a status.
+            raise NoAnswer("status not terminated in %ss" % timeout)
+    except socket.error:
+        cache.failed(host, port)
+        raise
+    cache.succeeded(host, port)
+    return raw_status
 
 
 def mock_get_gearmand_status():
@@ -301,33 +359,76 @@ def main():
     """
 
     plugin = Plugin()
-    plugin.add_arg("q", "queue", "Name of the queue to be checked")
+    plugin.add_arg("q", "queue", "Name of the queue to be checked "
+            "(comma-separated list in passive mode)")
     plugin.add_arg("p", "port", "Port to connect (default: 4730)",
             required = False)
+    add_passive_options(plugin.parser, "Gearman queue %s")
+    add_timing_options(plugin.parser)
     plugin.activate()
+    if plugin.opts.profile_dir:
+        start_profiler(plugin.opts.profile_dir)
     if not plugin['port']:
         plugin['port'] = 4730
+    if plugin['timeout']:
+        connect_timeout = read_timeout = float(plugin['timeout'])
+    else:
+        connect_timeout, read_timeout = CONNECT_TIMEOUT, READ_TIMEOUT
 
+    passive = PassiveResults.from_options(plugin.opts, plugin['host'])
+    if passive:
+        queues = plugin['queue'].split(',')
+    else:
+        queues = [plugin['queue']]
 
+    timer = PhaseTimer()
     if DEBUG_MOCK_GEARMAND:
         raw_status = mock_get_gearmand_status()
     else:
         try:
             # String with Gearmand's output for command 'status'.
-            raw_status = get_gearmand_status(plugin['host'], plugin['port'])
-        except socket.error:
-            plugin.nagios_exit("UNKNOWN", "Failed connection")
+            raw_status = get_gearmand_status(plugin['host'], plugin['port'],
+                    read_timeout, connect_timeout, timer=timer)
+        except socket.error, err:
+            if isinstance(err, TargetBackoff):
+                message = "Failed connection (%s)" % err
+            elif isinstance(err, NoAnswer):
+                message = "No answer (%s)" % err
+            else:
+                message = "Failed connection"
+            if not passive:
+                plugin.nagios_exit("UNKNOWN", message, timer.perfdata())
+            for queue in queues:
+                passive.add(queue, plugin.errors["UNKNOWN"],
+                        "UNKNOWN : %s" % message, perfdata=timer.perfdata())
+            passive.submit_and_exit()
             
+    timer.mark()
     # Dict with one key for every queue.
     status = parse_gearmand_status(raw_status)
-
-    if not status.has_key (plugin['queue']):
-        plugin.nagios_exit("UNKNOWN", "Queue %s not found" % plugin['queue'])
-
-    total_jobs = status[plugin['queue']][0]
-    plugin.check_range(total_jobs)
-
-    return 0
+    timer.lap('parse')
+
+    if not passive:
+        if not status.has_key (plugin['queue']):
+            plugin.nagios_exit("UNKNOWN", "Queue %s not found" % plugin['queue'],
+                    timer.perfdata())
+
+        total_jobs = status[plugin['queue']][0]
+        code_text, message = plugin.evaluate_range(total_jobs)
+        timer.lap('eval')
+        plugin.nagios_exit(code_text, message, timer.perfdata())
+
+    results = []
+    for queue in queues:
+        if status.has_key(queue):
+            results.append((queue,) + plugin.evaluate_range(status[queue][0]))
+        else:
+            results.append((queue, "UNKNOWN", "Queue %s not found" % queue))
+    timer.lap('eval')
+    for queue, code_text, message in results:
+        passive.add(queue, plugin.errors[code_text],
+                "%s : %s" % (code_text, message), perfdata=timer.perfdata())
+    passive.submit_and_exit()
 
 
 
@@ -5,6 +5,12 @@
 
 from pynag.Plugins import PluginHelper, ok, warning, critical, unknown
 import requests
+from timeit import default_timer
+from nagios_passive import PassiveResults, add_passive_options, STATUS_TEXT
+from nagios_timing import PhaseTimer, add_timing_options, start_profiler
+
+# Fields of /api/overview used by the check.
+OVERVIEW_COLUMNS = 'message_stats.deliver_get_details.avg_rate'
 
 
 def show_response():
@@ -16,6 +22,36 @@ def show_response():
     print
 
 
+def get_overview(hostname, port, auth, columns=OVERVIEW_COLUMNS, timeout=None):
+    """Retrieves /api/overview from the RabbitMQ management API.
+
+    Returns the requests.Response; 'columns' is a comma-separated list.
+    """
+    # Build the metric URL.
+    api = 'http://{}:{}/api/overview'.format(hostname, port)
+    payload = { 
+        'msg_rates_age': '3600',
+        'msg_rates_incr': '10',
+        'columns': columns,
+    }
+    # The plugin needs no timeout: pynag has --timeout option for the whole plugin.
+    return requests.get(api, params=payload, auth=auth, timeout=timeout)
+
+
+def exit_plugin(plugin, passive, timer):
+    """Exits as pynag does, or submits the result if running in passive mode.
+    """
+    for label, value in timer.metrics():
+        plugin.add_metric(label, value, uom='ms')
+    if passive:
+        # The overview covers the whole cluster: a single result.
+        output = '{}: {}'.format(STATUS_TEXT[plugin.get_status()], plugin.get_summary())
+        passive.add(plugin.options.hostname, plugin.get_status(), output,
+                    perfdata=plugin.get_perfdata())
+        passive.submit_and_exit()
+    plugin.exit()
+
+
 
 if __name__ == '__main__':
     plugin = PluginHelper()
@@ -23,36 +59,46 @@ if __name__ == '__main__':
     plugin.parser.add_option('-P','--port', help="RabbitMQ port", default='15672')
     plugin.parser.add_option('--user', help="RabbitMQ user", default='guest')
     plugin.parser.add_option('--password', help="RabbitMQ password", default='guest')
+    add_passive_options(plugin.parser, "RabbitMQ metrics")
+    add_timing_options(plugin.parser)
     plugin.parse_arguments()
+    if plugin.options.profile_dir:
+        start_profiler(plugin.options.profile_dir)
+
+    passive = PassiveResults.from_options(plugin.options, plugin.options.hostname)
 
     # Auth for RabbitMQ REST API.
     auth = (plugin.options.user, plugin.options.password)
-    # Build the metric URL.
-    api = 'http://{}:{}/api/overview'.format(plugin.options.hostname, plugin.options.port)
-    payload = { 
-        'msg_rates_age': '3600',
-        'msg_rates_incr': '10',
-        'columns': 'message_stats.deliver_get_details.avg_rate',
-    }
 
-    # No need to specify a timeout: pynag has --timeout option for the whole plugin.
-    r = requests.get(api, params=payload, auth=auth)
+    timer = PhaseTimer()
+    started = default_timer()
+    r = get_overview(plugin.options.hostname, plugin.options.port, auth)
+    # requests doesn't tell DNS and connection apart: everything up to the
+    # response headers is 'ttfb', and the body is 'read'.
+    ttfb = r.elapsed.total_seconds()
+    timer.add('ttfb', ttfb)
+    timer.add('read', default_timer() - started - ttfb)
 
     if plugin.options.show_debug:
         show_response()
 
     if r.status_code == 401:
+        plugin.status(unknown)
         plugin.add_summary("Login failed")
-        plugin.exit()
+        exit_plugin(plugin, passive, timer)
 
+    timer.mark()
     try:
         deliver_rate = r.json()["message_stats"]["deliver_get_details"]["avg_rate"]
+        timer.lap('parse')
     except ValueError:
+        plugin.status(unknown)
         plugin.add_summary("Can't decode server's response")
-        plugin.exit()
+        exit_plugin(plugin, passive, timer)
  
     plugin.add_metric('deliver_rate', deliver_rate)
     plugin.add_summary('message.deliver.avg_rate: {}'.format(deliver_rate))
     plugin.check_all_metrics()
-    plugin.exit()
+    timer.lap('eval')
+    exit_plugin(plugin, passive, timer)
 
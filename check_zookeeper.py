@@ -4,85 +4,149 @@
 # Nagios plugin; checks a server's status in a Zookeeper cluster.
 
 
-from telnetlib import Telnet
 import socket
+import select
+from timeit import default_timer
 from pynag.Plugins import PluginHelper, ok, warning, critical, unknown
+from nagios_passive import PassiveResults, add_passive_options, STATUS_TEXT
+from nagios_negcache import NegativeCache, TargetBackoff
+from nagios_timing import PhaseTimer, add_timing_options, start_profiler, connect_telnet
 
 TELNET_TIMEOUT = 3
 
 
 class ZkClient:
-    def __init__(self, host, port, timeout=TELNET_TIMEOUT):
+    def __init__(self, host, port, timeout=TELNET_TIMEOUT, cache=None, timer=None):
         """Connect to zookeper's client.
+
+        Servers that failed recently raise TargetBackoff on cmd() without
+        connecting, see nagios_negcache. Phases of all commands add up on
+        self.timer, see nagios_timing.
         """
         self.host = host
         self.port = port
         self.timeout = timeout
+        if cache is None:
+            cache = NegativeCache()
+        self.cache = cache
+        if timer is None:
+            timer = PhaseTimer()
+        self.timer = timer
 
 
     def cmd(self, word):
         """Connect and send a 4letter command to Zookeeper.
         """
-        # Zookeeper closes the socket after every command, so we must reconnect every time.
-        tn = Telnet(self.host, self.port, self.timeout)
-        tn.write('{}\n'.format(word))
-        return tn.read_all()
-
-
-
-if __name__ == '__main__':
-    plugin = PluginHelper()
-    plugin.parser.add_option("-H","--hostname", help="Zookeeper's host", default='127.0.0.1')
-    plugin.parser.add_option("-p","--port", help="Zookeeper's port", default='2181')
-    plugin.parse_arguments()
-
+        self.cache.check(self.host, self.port)
+        self.timer.mark()
+        try:
+            # Zookeeper closes the socket after every command, so we must reconnect every time.
+            tn = connect_telnet(self.host, self.port, self.timeout, self.timer)
+            tn.write('{}\n'.format(word))
+            # 'timeout' covers the whole answer: select() and the reads share it.
+            deadline = default_timer() + self.timeout
+            readable = select.select([tn.get_socket()], [], [], self.timeout)[0]
+            self.timer.lap('ttfb')
+            if not readable:
+                tn.close()
+                raise socket.timeout("no answer after {}s".format(self.timeout))
+            reply = read_until_eof(tn, deadline)
+            self.timer.lap('read')
+        except socket.error:
+            self.cache.failed(self.host, self.port)
+            raise
+        self.cache.succeeded(self.host, self.port)
+        return reply
+
+
+
+def read_until_eof(tn, deadline):
+    """Like Telnet.read_all(), but gives up at 'deadline' (a default_timer()
+    value) raising socket.timeout. Closes the connection either way.
+    """
+    chunks = []
     try:
-        zk = ZkClient(plugin.options.hostname, plugin.options.port)
-    except socket.error:
-        plugin.status(critical)
-        plugin.add_summary("Can't connect to {}:{}".format(plugin.options.hostname, plugin.options.port))
-        plugin.exit()
+        while True:
+            remaining = deadline - default_timer()
+            if remaining <= 0:
+                raise socket.timeout("answer not finished in time")
+            tn.get_socket().settimeout(remaining)
+            data = tn.read_some()
+            if not data:
+                return ''.join(chunks)
+            chunks.append(data)
+    finally:
+        tn.close()
+
+
+
+def parse_mntr(txt):
+    """Builds dict from the output of 'mntr'.
+    """
+    # Parse lines of keys/values into a dictionary.
+    return dict( l.split('\t') for l in txt.strip().split('\n') if '\t' in l )
 
-    try:
-        if zk.cmd('ruok') != 'imok':
-            plugin.status(critical)
-            plugin.add_summary("Command 'ruok' failed")
-            plugin.exit()
-    except socket.error, socket.timeout:
-        plugin.status(critical)
-        plugin.add_summary("Can't connect to {}:{}".format(plugin.options.hostname, plugin.options.port))
-        plugin.exit()
 
+def check_server(zk):
+    """Runs all checks against a Zookeeper server. Returns (status, summary).
+    """
     try:
+        if zk.cmd('ruok') != 'imok':
+            return critical, "Command 'ruok' failed"
         if zk.cmd('isro') != 'rw':
-            plugin.status(critical)
-            plugin.add_summary("Zookeeper is not read-write (network partition? quorum?)")
-            plugin.exit()
-    except socket.error, socket.timeout:
-        plugin.status(critical)
-        plugin.add_summary("Can't connect to {}:{}".format(plugin.options.hostname, plugin.options.port))
-        plugin.exit()
+            return critical, "Zookeeper is not read-write (network partition? quorum?)"
+        # Get Zookeeper's status.
+        txt = zk.cmd('mntr')
+    except TargetBackoff as err:
+        return critical, "Can't connect to {}:{} ({})".format(zk.host, zk.port, err)
+    except socket.error:
+        return critical, "Can't connect to {}:{}".format(zk.host, zk.port)
 
-    # Get Zookeeper's status.
-    txt = zk.cmd('mntr')
-    # Parse lines of keys/values into a dictionary.
-    mntr = dict( l.split('\t') for l in txt.strip().split('\n') if '\t' in l )
+    zk.timer.mark()
+    mntr = parse_mntr(txt)
+    zk.timer.lap('parse')
 
     # Run checks.
     state = mntr.get('zk_server_state', None)
 
     if state in ['observer', 'standalone']:
-        plugin.status(critical)
-        plugin.add_summary("zk_server_state: {}".format(state))
+        result = critical, "zk_server_state: {}".format(state)
     elif state in ['leader_election']:
-        plugin.status(warning)
-        plugin.add_summary("zk_server_state: {}".format(state))
+        result = warning, "zk_server_state: {}".format(state)
     elif state not in ['leader', 'follower']:
-        plugin.status(critical)
-        plugin.add_summary("Unknown zk_server_state ({})".format(state))
+        result = critical, "Unknown zk_server_state ({})".format(state)
     else:
-        plugin.status(ok)
-        plugin.add_summary("zk_server_state: {}".format(state))
+        result = ok, "zk_server_state: {}".format(state)
+    zk.timer.lap('eval')
+    return result
+
 
-    plugin.exit()
 
+if __name__ == '__main__':
+    plugin = PluginHelper()
+    plugin.parser.add_option("-H","--hostname", help="Zookeeper's host (comma-separated list in passive mode)", default='127.0.0.1')
+    plugin.parser.add_option("-p","--port", help="Zookeeper's port", default='2181')
+    add_passive_options(plugin.parser, "Zookeeper")
+    add_timing_options(plugin.parser)
+    plugin.parse_arguments()
+    if plugin.options.profile_dir:
+        start_profiler(plugin.options.profile_dir)
+
+    passive = PassiveResults.from_options(plugin.options, None)
+
+    if not passive:
+        zk = ZkClient(plugin.options.hostname, plugin.options.port)
+        status, summary = check_server(zk)
+        plugin.status(status)
+        plugin.add_summary(summary)
+        for label, value in zk.timer.metrics():
+            plugin.add_metric(label, value, uom='ms')
+        plugin.exit()
+
+    # Passive mode: one result per member of the ensemble, each one on its own host.
+    for hostname in plugin.options.hostname.split(','):
+        zk = ZkClient(hostname, plugin.options.port)
+        status, summary = check_server(zk)
+        passive.add(hostname, status, "{}: {}".format(STATUS_TEXT[status], summary),
+                    host=passive.host or hostname, perfdata=zk.timer.perfdata())
+    passive.submit_and_exit()
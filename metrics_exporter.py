@@ -0,0 +1,443 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# metrics_exporter.py
+"""
+OpenMetrics exporter for the services checked by the Nagios plugins.
+
+Collects Gearmand queues, Zookeeper 'mntr', the RabbitMQ overview and
+Coraid shelves with the same functions the plugins use, and serves the
+metrics on http://ADDRESS:PORT/metrics for Prometheus.
+
+Every target is collected on its own thread, every 'interval' seconds.
+Collections render a new page of metrics; scrapes just send the last one,
+so they never wait for a backend.
+
+Targets are given as TARGET[/INTERVAL], e.g.:
+
+  # metrics_exporter.py --gearmand gm1:4730 --gearmand gm2/10 \\
+        --zookeeper zk1:2181 --zookeeper zk2:2181 --coraid 0@eth2/300
+
+Only the modules of the configured kinds of target are imported, so
+pynag, requests or pexpect are only needed if their targets are.
+"""
+
+# Copyright 2026 agent <agent@local>
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import os
+import re
+import sys
+import time
+import logging
+import threading
+from timeit import default_timer
+from optparse import OptionParser
+from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+from SocketServer import ThreadingMixIn
+
+from nagios_timing import PhaseTimer
+
+
+CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+# Seconds between collections of a target, unless the target sets its own.
+DEFAULT_INTERVAL = 30
+# Seconds to wait for a backend on every collection.
+COLLECT_TIMEOUT = 5
+# Help of every metric family; families not listed get a generic one.
+HELP = {
+    'gearmand_queue_jobs': "Jobs in a Gearmand queue",
+    'gearmand_queue_running_jobs': "Running jobs of a Gearmand queue",
+    'gearmand_queue_workers': "Workers available for a Gearmand queue",
+    'zookeeper_server_state': "Zookeeper server state (1 for the current)",
+    'coraid_shelf_up': "Whether the cec console answered for the shelf",
+    'coraid_shelf_lines': "Lines of 'show -l' and 'list -l' output",
+    'coraid_shelf_baseline_match': "Whether the shelf matches its baseline",
+    'exporter_collect_up': "Whether the last collection succeeded",
+    'exporter_collect_timestamp_seconds': "Time of the last collection",
+    'exporter_collect_phase_seconds': "Time of every phase of the last collection",
+}
+
+
+def parse_command_line():
+    """Optparse wrapper.
+    """
+    usage = "usage: %prog [options]"
+    parser = OptionParser(usage=usage)
+    parser.add_option("-l", "--listen", default='127.0.0.1:9117',
+        help="address:port to serve /metrics on (default: %default)")
+    parser.add_option("-i", "--interval", type="float",
+        default=DEFAULT_INTERVAL,
+        help="seconds between collections (default: %default)")
+    parser.add_option("--gearmand", action="append", default=[],
+        metavar="HOST[:PORT][/INTERVAL]", help="Gearmand to collect")
+    parser.add_option("--zookeeper", action="append", default=[],
+        metavar="HOST[:PORT][/INTERVAL]", help="Zookeeper server to collect")
+    parser.add_option("--rabbitmq", action="append", default=[],
+        metavar="HOST[:PORT][/INTERVAL]", help="RabbitMQ node to collect")
+    parser.add_option("--rabbitmq-user", default='guest',
+        help="RabbitMQ user (default: %default)")
+    parser.add_option("--rabbitmq-password", default='guest',
+        help="RabbitMQ password (default: %default)")
+    parser.add_option("--coraid", action="append", default=[],
+        metavar="SHELF[@INTERFACE][/INTERVAL]", help="Coraid shelf to collect")
+    parser.add_option("--coraid-basedir", default='/var/lib/check_coraid',
+        help="directory for baseline files (default: %default)")
+    parser.add_option("-d", "--debug", action="store_true", default=False,
+        help="show debugging info")
+
+    options, args = parser.parse_args()
+    if not (options.gearmand or options.zookeeper or options.rabbitmq
+            or options.coraid):
+        parser.error("You must provide at least one target")
+    return options, args
+
+
+
+def split_target(spec, separator, default, interval):
+    """Splits 'NAME[<separator>EXTRA][/INTERVAL]' into (name, extra, interval).
+    """
+    if '/' in spec:
+        spec, interval = spec.rsplit('/', 1)
+        interval = float(interval)
+    if separator in spec:
+        name, extra = spec.rsplit(separator, 1)
+    else:
+        name, extra = spec, default
+    return name, extra, interval
+
+
+def escape_label(value):
+    """Escapes a label value as OpenMetrics wants.
+    """
+    return str(value).replace('\\', '\\\\').replace('"', '\\"') \
+        .replace('\n', '\\n')
+
+
+def metric_name(text):
+    """Turns any text into a valid metric name.
+    """
+    return re.sub('[^a-zA-Z0-9_]', '_', text)
+
+
+def number(value):
+    """Returns value as a float, or None if it isn't a number.
+    """
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def format_value(value):
+    """Formats a sample value; OpenMetrics spells NaN, +Inf and -Inf so.
+    """
+    value = float(value)
+    if value != value:
+        return 'NaN'
+    if value == float('inf'):
+        return '+Inf'
+    if value == float('-inf'):
+        return '-Inf'
+    return repr(value)
+
+
+
+############################################################
+# Collect functions. Every one takes a PhaseTimer and returns a list of
+# samples: (family, {label: value}, value). Errors are raised.
+
+def collect_gearmand(host, port, timer):
+    """Samples of every queue of a Gearmand.
+    """
+    from check_gearmand_jobs import get_gearmand_status, parse_gearmand_status
+
+    # A status cut short raises: half the queues would look like a drain.
+    raw_status = get_gearmand_status(host, port, timeout=COLLECT_TIMEOUT,
+            connect_timeout=COLLECT_TIMEOUT, timer=timer)
+    timer.mark()
+    status = parse_gearmand_status(raw_status)
+    timer.lap('parse')
+    samples = []
+    for queue, fields in sorted(status.items()):
+        if len(fields) != 3 or None in [number(field) for field in fields]:
+            logging.warning("gearmand %s:%s: skipping malformed status of "
+                            "queue %r: %r", host, port, queue, fields)
+            continue
+        jobs, running, workers = fields
+        labels = {'queue': queue}
+        samples.append(('gearmand_queue_jobs', labels, jobs))
+        samples.append(('gearmand_queue_running_jobs', labels, running))
+        samples.append(('gearmand_queue_workers', labels, workers))
+    return samples
+
+
+def collect_zookeeper(host, port, timer):
+    """Samples of the numeric values in Zookeeper's 'mntr'.
+    """
+    from check_zookeeper import ZkClient, parse_mntr
+
+    zk = ZkClient(host, port, COLLECT_TIMEOUT, timer=timer)
+    txt = zk.cmd('mntr')
+    timer.mark()
+    mntr = parse_mntr(txt)
+    timer.lap('parse')
+    samples = []
+    for key, value in sorted(mntr.items()):
+        if key == 'zk_server_state':
+            samples.append(('zookeeper_server_state', {'state': value}, 1))
+        elif number(value) is not None:
+            # 'zk_avg_latency' -> 'zookeeper_avg_latency'
+            family = 'zookeeper_' + metric_name(key[len('zk_'):])
+            samples.append((family, {}, value))
+    return samples
+
+
+# Fields of /api/overview exported, on top of the one checked by the plugin.
+RABBITMQ_COLUMNS = ','.join([
+    'message_stats.deliver_get_details.avg_rate',
+    'message_stats.publish_details.avg_rate',
+    'queue_totals.messages',
+    'queue_totals.messages_ready',
+    'queue_totals.messages_unacknowledged',
+    'object_totals.connections',
+    'object_totals.channels',
+    'object_totals.queues',
+    'object_totals.consumers',
+])
+
+def collect_rabbitmq(host, port, auth, timer):
+    """Samples of the numeric fields in RabbitMQ's overview.
+    """
+    from check_rabbitmq_metrics import get_overview
+
+    started = default_timer()
+    r = get_overview(host, port, auth, RABBITMQ_COLUMNS, COLLECT_TIMEOUT)
+    # As in the plugin: up to the response headers is 'ttfb'.
+    ttfb = r.elapsed.total_seconds()
+    timer.add('ttfb', ttfb)
+    timer.add('read', default_timer() - started - ttfb)
+    timer.mark()
+    r.raise_for_status()
+    overview = r.json()
+    samples = []
+    pending = [('rabbitmq', overview)]
+    while pending:
+        prefix, tree = pending.pop()
+        for key, value in tree.items():
+            family = metric_name('%s_%s' % (prefix, key))
+            if isinstance(value, dict):
+                pending.append((family, value))
+            elif number(value) is not None:
+                samples.append((family, {}, value))
+    timer.lap('parse')
+    return sorted(samples)
+
+
+def collect_coraid(shelf, interface, basedir, timer):
+    """Samples of a Coraid shelf: answering, output size, baseline match.
+    """
+    from check_coraid import cec_expect
+
+    output = cec_expect(shelf, interface, timer)
+    samples = [
+        ('coraid_shelf_up', {}, int(bool(output))),
+        ('coraid_shelf_lines', {}, len(output.splitlines())),
+    ]
+    baseline_fname = os.path.join(basedir, 'shelf%s.baseline' % shelf)
+    if os.path.isfile(baseline_fname):
+        timer.mark()
+        baseline = open(baseline_fname).read()
+        samples.append(('coraid_shelf_baseline_match', {},
+                        int(baseline == output)))
+        timer.lap('eval')
+    return samples
+
+
+
+############################################################
+
+class Collector(threading.Thread):
+    """Collects a target every 'interval' seconds and keeps its samples.
+    """
+
+    def __init__(self, registry, kind, target, interval, collect, *args):
+        threading.Thread.__init__(self, name='%s %s' % (kind, target))
+        self.daemon = True
+        self.registry = registry
+        self.labels = {'collector': kind, 'target': target}
+        self.interval = interval
+        self.collect = collect
+        self.args = args
+        # Last samples, replaced as a whole: readers need no lock.
+        self.samples = []
+
+
+    def collect_once(self):
+        """Runs one collection and stores its samples.
+        """
+        timer = PhaseTimer()
+        started = time.time()
+        try:
+            samples = self.collect(*(self.args + (timer,)))
+            up = 1
+        except Exception:
+            logging.warning("%s: collection failed: %s", self.name,
+                            sys.exc_info()[1])
+            logging.debug("%s: collection failed", self.name, exc_info=True)
+            samples = []
+            up = 0
+
+        target = {'target': self.labels['target']}
+        samples = [(family, dict(labels, **target), value)
+                   for family, labels, value in samples]
+        samples.append(('exporter_collect_up', self.labels, up))
+        samples.append(('exporter_collect_timestamp_seconds', self.labels,
+                        started))
+        for name in timer.order:
+            samples.append(('exporter_collect_phase_seconds',
+                            dict(self.labels, phase=name),
+                            timer.elapsed[name]))
+        self.samples = samples
+        self.registry.update()
+
+
+    def run(self):
+        while True:
+            started = time.time()
+            self.collect_once()
+            time.sleep(max(0, self.interval - (time.time() - started)))
+
+
+
+class Registry:
+    """Renders the samples of all collectors into a single page.
+    """
+
+    def __init__(self):
+        self.collectors = []
+        self.lock = threading.Lock()
+        self.page = '# EOF\n'
+
+
+    def update(self):
+        """Renders the page again; called after every collection.
+        """
+        # One render at a time, so an older one never overwrites a newer.
+        self.lock.acquire()
+        try:
+            self.page = self.render()
+        finally:
+            self.lock.release()
+
+
+    def render(self):
+        """Returns the page with the current samples of all collectors.
+        """
+        families = {}
+        for collector in self.collectors:
+            for family, labels, value in collector.samples:
+                families.setdefault(family, []).append((labels, value))
+
+        lines = []
+        for family in sorted(families):
+            lines.append('# TYPE %s gauge\n' % family)
+            lines.append('# HELP %s %s\n' % (
+                family, HELP.get(family, family.replace('_', ' '))))
+            for labels, value in families[family]:
+                label_text = ','.join(['%s="%s"' % (name, escape_label(labels[name]))
+                                       for name in sorted(labels)])
+                lines.append('%s{%s} %s\n' % (family, label_text,
+                                              format_value(value)))
+        lines.append('# EOF\n')
+        return ''.join(lines)
+
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        page = self.server.registry.page
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(page)))
+        self.end_headers()
+        self.wfile.write(page)
+
+    def log_message(self, format, *args):
+        logging.debug(format, *args)
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+
+def build_collectors(opts, registry):
+    """Returns a Collector for every target on the command line.
+    """
+    collectors = []
+    for spec in opts.gearmand:
+        host, port, interval = split_target(spec, ':', '4730', opts.interval)
+        collectors.append(Collector(registry, 'gearmand', '%s:%s' % (host, port),
+                interval, collect_gearmand, host, int(port)))
+    for spec in opts.zookeeper:
+        host, port, interval = split_target(spec, ':', '2181', opts.interval)
+        collectors.append(Collector(registry, 'zookeeper', '%s:%s' % (host, port),
+                interval, collect_zookeeper, host, int(port)))
+    auth = (opts.rabbitmq_user, opts.rabbitmq_password)
+    for spec in opts.rabbitmq:
+        host, port, interval = split_target(spec, ':', '15672', opts.interval)
+        collectors.append(Collector(registry, 'rabbitmq', '%s:%s' % (host, port),
+                interval, collect_rabbitmq, host, port, auth))
+    for spec in opts.coraid:
+        shelf, interface, interval = split_target(spec, '@', 'eth0', opts.interval)
+        collectors.append(Collector(registry, 'coraid',
+                'shelf%s@%s' % (shelf, interface), interval, collect_coraid,
+                shelf, interface, opts.coraid_basedir))
+    return collectors
+
+
+def main():
+    """Runs unless imported.
+    """
+    opts, ___ = parse_command_line()
+    if opts.debug:
+        logging.basicConfig(level=logging.DEBUG)
+    else:
+        logging.basicConfig(level=logging.INFO)
+
+    registry = Registry()
+    registry.collectors = build_collectors(opts, registry)
+
+    address, port = opts.listen.rsplit(':', 1)
+    server = ThreadingHTTPServer((address, int(port)), MetricsHandler)
+    server.registry = registry
+
+    for collector in registry.collectors:
+        collector.start()
+    logging.info("Serving /metrics on %s", opts.listen)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
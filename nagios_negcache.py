@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# nagios_negcache.py
+"""
+Negative cache of unreachable targets, shared by the plugins.
+
+Every plugin run is a new process, so the cache lives on disk: one small
+file per host:port under CACHE_DIR, holding the number of consecutive
+failures and the time of the next allowed attempt. CACHE_DIR can be
+set with the NAGIOS_NEGCACHE_DIR environment variable. While a target is
+backing off, clients raise TargetBackoff right away instead of waiting for
+a connection timeout. The backoff doubles on every failure, from
+BACKOFF_MIN up to BACKOFF_MAX seconds, and the first success clears it.
+
+Usage from a client:
+
+    cache = NegativeCache()
+    cache.check(host, port)         # raises TargetBackoff
+    try:
+        ...talk to host:port...
+    except socket.error:
+        cache.failed(host, port)
+        raise
+    cache.succeeded(host, port)
+
+The cache is best-effort: if CACHE_DIR can't be written checks just run
+as if there were no cache. It's also ignored unless it's a real directory
+owned by the user running the plugin and writable by nobody else, since
+anyone able to write there could make checks skip a target.
+"""
+
+# Copyright 2026 agent <agent@local>
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import os
+import stat
+import time
+import socket
+import tempfile
+
+
+# Directory with one state file per failing target.
+CACHE_DIR = os.environ.get('NAGIOS_NEGCACHE_DIR', '/var/lib/nagios_negcache')
+# Seconds to skip a target after its first failure.
+BACKOFF_MIN = 10
+# Upper limit for the backoff, however many failures in a row.
+BACKOFF_MAX = 300
+
+
+class TargetBackoff(socket.error):
+    """A target failed recently and is not being retried yet.
+
+    Subclass of socket.error, so it's handled as any connection failure.
+    """
+
+
+
+class NegativeCache:
+    """Remembers failing host:port targets across plugin runs.
+    """
+
+    def __init__(self, directory=CACHE_DIR, backoff_min=BACKOFF_MIN,
+                 backoff_max=BACKOFF_MAX):
+        self.directory = directory
+        self.backoff_min = backoff_min
+        self.backoff_max = backoff_max
+
+
+    def _usable(self, create=False):
+        """Whether the directory is safe to use, creating it if asked to.
+        """
+        if create and not os.path.lexists(self.directory):
+            try:
+                os.mkdir(self.directory, 0o700)
+            except OSError:
+                return False
+        try:
+            info = os.lstat(self.directory)
+        except OSError:
+            return False
+        return (stat.S_ISDIR(info.st_mode) and info.st_uid == os.geteuid()
+                and not info.st_mode & (stat.S_IWGRP | stat.S_IWOTH))
+
+
+    def _path(self, host, port):
+        """State file for a target.
+        """
+        name = "%s_%s" % (host, port)
+        return os.path.join(self.directory, name.replace(os.sep, '_'))
+
+
+    def _read(self, host, port):
+        """Returns (failures, retry_time); (0, 0) for unknown targets.
+        """
+        if not self._usable():
+            return 0, 0
+        try:
+            fields = open(self._path(host, port)).read().split()
+            return int(fields[0]), float(fields[1])
+        except (IOError, ValueError, IndexError):
+            return 0, 0
+
+
+    def retry_in(self, host, port):
+        """Seconds left before the target may be tried again (0 if now).
+        """
+        failures, retry_time = self._read(host, port)
+        return max(0, retry_time - time.time())
+
+
+    def check(self, host, port):
+        """Raises TargetBackoff if the target is backing off.
+        """
+        wait = self.retry_in(host, port)
+        if wait:
+            raise TargetBackoff("%s:%s failed recently, next try in %ds"
+                                % (host, port, wait + 0.5))
+
+
+    def failed(self, host, port):
+        """Records a failure and doubles the target's backoff.
+        """
+        failures, retry_time = self._read(host, port)
+        backoff = min(self.backoff_max, self.backoff_min * 2 ** failures)
+        if not self._usable(create=True):
+            return
+        # Write and rename: concurrent readers never see half a file.
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+        except OSError:
+            return
+        try:
+            try:
+                os.write(fd, ("%d %f\n" % (failures + 1, time.time() + backoff))
+                         .encode('ascii'))
+            finally:
+                os.close(fd)
+            os.rename(tmp_path, self._path(host, port))
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+
+    def succeeded(self, host, port):
+        """Clears the target's backoff.
+        """
+        try:
+            os.unlink(self._path(host, port))
+        except OSError:
+            # Nothing to clear, or nothing we can do about it.
+            pass
@@ -0,0 +1,277 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# nagios_passive.py
+"""
+Passive check results for the Nagios plugins in this directory.
+
+Instead of running once per service, a plugin can check many targets on a
+single run (all the queues of a Gearmand, every member of a Zookeeper
+ensemble...) and hand the results to Nagios as passive checks. Results are
+buffered and written at once, either:
+
+  * to the external command file, as PROCESS_SERVICE_CHECK_RESULT commands
+    (--command-file=/var/lib/nagios3/rw/nagios.cmd), or
+  * to the checkresults spool directory, as a single check result file
+    (--spool-dir=/var/lib/nagios3/spool/checkresults).
+
+Usage from a plugin:
+
+    add_passive_options(parser, 'Gearman queue %s')
+    ...
+    results = PassiveResults.from_options(options, default_host)
+    if results:
+        results.add(name, 0, 'OK : 3 jobs')
+        ...
+        results.submit_and_exit()
+"""
+
+# Copyright 2026 agent <agent@local>
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import os
+import sys
+import time
+import select
+import errno
+import random
+import string
+
+
+STATUS_TEXT = { 0:"OK", 1:"WARNING", 2:"CRITICAL", 3:"UNKNOWN", }
+
+
+def add_passive_options(parser, service_default):
+    """Adds the passive-mode options to an OptionParser.
+
+    @parser: optparse.OptionParser (pynag's PluginHelper.parser is one too)
+    @service_default: template for the service description; '%s' is
+        replaced by the name of every checked target
+    """
+    parser.add_option("--command-file", dest="command_file", default=None,
+        help="submit passive results to this Nagios command file")
+    parser.add_option("--spool-dir", dest="spool_dir", default=None,
+        help="submit passive results to this checkresults directory")
+    parser.add_option("--passive-host", dest="passive_host", default=None,
+        help="host_name of the passive results (default: target host)")
+    parser.add_option("--service", dest="service", default=service_default,
+        help="service description of the passive results; '%%s' is the "
+             "target name (default: %s)" % service_default.replace('%', '%%'))
+
+
+def escape_output(output):
+    """Fits plugin output in a single line, as external commands need.
+    """
+    return output.strip().replace('\r', '').replace('\n', '\\n')
+
+
+def clean_field(text):
+    """Makes a host_name or service description safe for the command file
+    and the spool: newlines would start a new command or key, and ';'
+    a new command field.
+    """
+    for char in '\r\n;':
+        text = text.replace(char, ' ')
+    return text
+
+
+def format_command(host, service, code, output, timestamp):
+    """Returns a PROCESS_SERVICE_CHECK_RESULT external command.
+    """
+    return "[%d] PROCESS_SERVICE_CHECK_RESULT;%s;%s;%d;%s\n" % (
+        timestamp, host, service, code, escape_output(output))
+
+
+def format_checkresult(host, service, code, output, timestamp):
+    """Returns a service block for a checkresults spool file.
+    """
+    return ("### Nagios Service Check Result ###\n"
+            "# Time: %s\n"
+            "host_name=%s\n"
+            "service_description=%s\n"
+            "check_type=1\n"
+            "check_options=0\n"
+            "scheduled_check=0\n"
+            "reschedule_check=0\n"
+            "latency=0.0\n"
+            "start_time=%d.0\n"
+            "finish_time=%d.0\n"
+            "early_timeout=0\n"
+            "exited_ok=1\n"
+            "return_code=%d\n"
+            "output=%s\n"
+            "\n") % (time.ctime(timestamp), host, service, timestamp,
+                     timestamp, code, escape_output(output))
+
+
+
+class PassiveResults:
+    """Buffer of passive service results, submitted at once.
+    """
+
+    def __init__(self, host, service, command_file=None, spool_dir=None):
+        self.host = host
+        self.service = service
+        self.command_file = command_file
+        self.spool_dir = spool_dir
+        self.results = []
+
+
+    def from_options(cls, options, default_host):
+        """Returns a PassiveResults if passive mode was requested, else None.
+        """
+        if not options.command_file and not options.spool_dir:
+            return None
+        host = options.passive_host or default_host
+        return cls(host, options.service, options.command_file,
+                   options.spool_dir)
+    from_options = classmethod(from_options)
+
+
+    def add(self, target, code, output, host=None, perfdata=None):
+        """Queues the result of one target.
+
+        @target: replaces '%s' on the service description
+        @code: Nagios return code (0-3)
+        @output: plugin output
+        @host: overrides the host_name of this result
+        @perfdata: appended to the output, if any
+        """
+        if perfdata:
+            output = "%s | %s" % (output, perfdata)
+        # Not '%': services like 'Disk 90% %s' must work too.
+        service = self.service.replace('%s', str(target))
+        self.results.append((clean_field(host or self.host),
+                             clean_field(service), int(code), output,
+                             int(time.time())))
+
+
+    def submit(self):
+        """Writes every queued result at once. Returns how many were sent.
+        """
+        if self.command_file:
+            self._write_command_file()
+        if self.spool_dir:
+            self._write_spool()
+        sent = len(self.results)
+        self.results = []
+        return sent
+
+
+    def submit_and_exit(self):
+        """Submits the results and exits with the plugin's own status line.
+
+        The plugin run is OK if Nagios got the results, whatever they say.
+        """
+        summary = self.summary()
+        try:
+            self.submit()
+        except (IOError, OSError):
+            err = sys.exc_info()[1]
+            sys.stdout.write("UNKNOWN: Can't submit passive results: %s\n" % err)
+            sys.exit(3)
+        sys.stdout.write("OK: %s\n" % summary)
+        sys.exit(0)
+
+
+    def summary(self):
+        """One-line report of the queued results, for the plugin's stdout.
+        """
+        counts = {}
+        for result in self.results:
+            counts[result[2]] = counts.get(result[2], 0) + 1
+        text = ', '.join(["%d %s" % (counts[code], STATUS_TEXT[code])
+                          for code in sorted(counts)])
+        return "%d passive results submitted (%s)" % (len(self.results), text)
+
+
+    def _write_command_file(self):
+        """Sends all commands to the Nagios pipe, in as few write() calls
+        as keep them atomic.
+        """
+        commands = [to_bytes(format_command(*result)) for result in self.results]
+        # No O_CREAT: if the pipe isn't there, Nagios isn't listening.
+        fd = os.open(self.command_file, os.O_WRONLY | os.O_APPEND)
+        try:
+            for chunk in pipe_chunks(commands):
+                write_all(fd, chunk)
+        finally:
+            os.close(fd)
+
+
+    def _write_spool(self):
+        """Drops a single check result file and its '.ok' flag on the spool.
+        """
+        buf = "### Active Check Result File ###\nfile_time=%d\n\n" % (
+            int(time.time()))
+        buf += ''.join([format_checkresult(*result) for result in self.results])
+        fd, path = create_spool_file(self.spool_dir)
+        try:
+            write_all(fd, to_bytes(buf))
+        finally:
+            os.close(fd)
+        # Nagios ignores the file until its '.ok' flag exists.
+        open(path + '.ok', 'w').close()
+
+
+
+def to_bytes(text):
+    """Encodes unicode text; byte strings (Python 2 'str') pass as they are.
+    """
+    if isinstance(text, bytes):
+        return text
+    return text.encode('utf-8')
+
+
+def pipe_chunks(lines):
+    """Joins lines into chunks of up to PIPE_BUF bytes, never splitting one.
+
+    Writes of up to PIPE_BUF bytes to a pipe are atomic: other writers of
+    the command file can't interleave with them.
+    """
+    chunk = b''
+    for line in lines:
+        if chunk and len(chunk) + len(line) > select.PIPE_BUF:
+            yield chunk
+            chunk = b''
+        chunk += line
+    if chunk:
+        yield chunk
+
+
+def write_all(fd, data):
+    """os.write() until all data is out; a single call if nothing interrupts.
+    """
+    while data:
+        data = data[os.write(fd, data):]
+
+
+def create_spool_file(spool_dir):
+    """Creates a new, empty check result file. Returns (fd, path).
+
+    Nagios only reaps files named 'c' plus six characters, so
+    tempfile.mkstemp() names don't fit.
+    """
+    chars = string.ascii_letters + string.digits
+    while True:
+        name = 'c' + ''.join([random.choice(chars) for i in range(6)])
+        path = os.path.join(spool_dir, name)
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        except OSError as err:
+            if err.errno == errno.EEXIST:
+                continue
+            raise
+        return fd, path
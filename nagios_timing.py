@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# nagios_timing.py
+"""
+Per-phase timing of a plugin run, reported as perfdata.
+
+A PhaseTimer works like a stopwatch with laps: each call to lap(name)
+charges the time since the previous lap to the phase 'name'. Phases
+repeated on a run (one connection per Zookeeper command...) add up.
+The phases used by the plugins are:
+
+  dns       name resolution
+  connect   TCP connection (for 'cec', until its banner)
+  ttfb      waiting for the first byte of the answer
+  read      reading the rest of the answer
+  parse     turning the answer into values
+  eval      checking the values against thresholds
+
+check_coraid.py also times each step of its 'cec' session: spawn, prompt,
+show, list and disconnect.
+
+Usage:
+
+    timer = PhaseTimer()
+    client = connect_telnet(host, port, timeout, timer)
+    ...
+    timer.lap('read')
+    ...
+    print "OK: all fine | %s" % timer.perfdata()
+
+With --profile-dir, a whole run is also profiled with cProfile; stats are
+dumped on exit to a new pstats file per run.
+"""
+
+# Copyright 2026 agent <agent@local>
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import os
+import sys
+import time
+import socket
+import atexit
+from telnetlib import Telnet
+from timeit import default_timer
+
+
+class PhaseTimer:
+    """Stopwatch that charges elapsed time to named phases.
+    """
+
+    def __init__(self):
+        self.order = []
+        self.elapsed = {}
+        self.last = default_timer()
+
+
+    def mark(self):
+        """Restarts the stopwatch without charging the time to any phase.
+        """
+        self.last = default_timer()
+
+
+    def lap(self, name):
+        """Charges the time since the previous lap (or mark) to 'name'.
+        """
+        now = default_timer()
+        self.add(name, now - self.last)
+        self.last = now
+
+
+    def add(self, name, seconds):
+        """Charges time measured elsewhere to 'name'.
+        """
+        if name not in self.elapsed:
+            self.order.append(name)
+            self.elapsed[name] = 0.0
+        self.elapsed[name] += seconds
+
+
+    def metrics(self):
+        """Returns [(label, milliseconds)] in the order phases first ran.
+        """
+        return [("%s_ms" % name, round(self.elapsed[name] * 1000, 3))
+                for name in self.order]
+
+
+    def perfdata(self):
+        """Returns the phases as Nagios perfdata ('dns_ms=0.2ms ...').
+        """
+        return ' '.join(["%s=%sms" % metric for metric in self.metrics()])
+
+
+
+def connect_telnet(host, port, timeout, timer):
+    """Opens a Telnet to host:port, timing the 'dns' and 'connect' phases.
+
+    Like socket.create_connection(), tries every address 'host' resolves to
+    until one accepts; if none does, the last error is raised.
+    """
+    addresses = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+    timer.lap('dns')
+    errors = [socket.error("getaddrinfo returns an empty list")]
+    for family, socktype, proto, canonname, sockaddr in addresses:
+        try:
+            client = Telnet(sockaddr[0], port, timeout)
+        except socket.error as err:
+            errors.append(err)
+            continue
+        timer.lap('connect')
+        return client
+    timer.lap('connect')
+    raise errors[-1]
+
+
+
+def add_timing_options(parser):
+    """Adds the profiling option to an OptionParser.
+    """
+    parser.add_option("--profile-dir", dest="profile_dir", default=None,
+        help="profile the run with cProfile and dump stats to this directory")
+
+
+def start_profiler(directory, name=None):
+    """Profiles the rest of the run; stats are dumped when the process exits.
+
+    Returns the path of the pstats file to be written.
+    """
+    import cProfile
+
+    if name is None:
+        name = os.path.splitext(os.path.basename(sys.argv[0]))[0]
+    path = os.path.join(directory, "%s-%s-%d.pstats" % (
+        name, time.strftime('%Y%m%d%H%M%S'), os.getpid()))
+
+    profiler = cProfile.Profile()
+
+    def dump():
+        profiler.disable()
+        try:
+            profiler.dump_stats(path)
+        except (IOError, OSError):
+            # A broken profile must not change the check result.
+            pass
+
+    # atexit handlers also run on sys.exit(), the way all plugins end.
+    atexit.register(dump)
+    profiler.enable()
+    return path
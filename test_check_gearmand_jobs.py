@@ -0,0 +1,209 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# test_check_gearmand_jobs.py
+"""
+Tests for check_gearmand_jobs.py, against bench/fakes.py. Run with:
+python -m unittest discover
+"""
+
+# Copyright 2026 agent <agent@local>
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import os
+import re
+import sys
+import shutil
+import socket
+import tempfile
+import subprocess
+import unittest
+from timeit import default_timer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                'bench'))
+
+from check_gearmand_jobs import get_gearmand_status, parse_gearmand_status, \
+    STATUS_END, NoAnswer
+from nagios_negcache import NegativeCache, TargetBackoff
+from nagios_timing import PhaseTimer
+from fakes import FakeGearmand
+
+
+PLUGIN = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                      'check_gearmand_jobs.py')
+
+
+class StatusEndTest(unittest.TestCase):
+
+    def test_terminated(self):
+        for text in [".\n", "q\t1\t0\t1\n.\n", "q\t1\t0\t1\r\n.\r\n"]:
+            self.assertTrue(re.search(STATUS_END, text), repr(text))
+
+    def test_not_terminated(self):
+        for text in ["", "q\t1\t0\t1\n", "q\t1\t0\t1\n.", "q.\n", "q\t1\t0\t1.\n"]:
+            self.assertFalse(re.search(STATUS_END, text), repr(text))
+
+
+
+class GetStatusTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = NegativeCache(os.path.join(self.directory, 'negcache'))
+        self.fake = None
+
+    def tearDown(self):
+        if self.fake:
+            self.fake.stop()
+        shutil.rmtree(self.directory)
+
+    def start(self, **knobs):
+        self.fake = FakeGearmand(**knobs).start()
+        return self.fake.port
+
+    def test_status(self):
+        port = self.start(size=3)
+        timer = PhaseTimer()
+        raw_status = get_gearmand_status('127.0.0.1', port, cache=self.cache,
+                                         timer=timer)
+        self.assertEqual(parse_gearmand_status(raw_status), {
+            'queue0': ['0', '0', '0'],
+            'queue1': ['1', '0', '1'],
+            'queue2': ['2', '0', '2'],
+        })
+        self.assertEqual(timer.order, ['dns', 'connect', 'ttfb', 'read'])
+        self.assertEqual(self.cache.retry_in('127.0.0.1', port), 0)
+
+    def test_trickled_status(self):
+        port = self.start(size=20, trickle=0.001, chunk=7)
+        raw_status = get_gearmand_status('127.0.0.1', port, cache=self.cache)
+        self.assertEqual(len(parse_gearmand_status(raw_status)), 20)
+
+    def test_truncated_status(self):
+        # The closing '.' line comes well after the timeout.
+        port = self.start(size=50, trickle=0.2, chunk=100)
+        self.assertRaises(NoAnswer, get_gearmand_status, '127.0.0.1',
+                          port, timeout=0.3, cache=self.cache)
+        self.assertRaises(TargetBackoff, self.cache.check, '127.0.0.1', port)
+
+    def test_no_answer(self):
+        port = self.start(latency=1)
+        started = default_timer()
+        self.assertRaises(socket.timeout, get_gearmand_status, '127.0.0.1',
+                          port, timeout=0.3, cache=self.cache)
+        self.assertTrue(default_timer() - started < 0.6)
+        self.assertRaises(TargetBackoff, self.cache.check, '127.0.0.1', port)
+
+    def test_timeout_covers_whole_read(self):
+        # Answer starts just before the timeout and trickles past it.
+        port = self.start(latency=0.2, size=50, trickle=0.05, chunk=50)
+        started = default_timer()
+        self.assertRaises(socket.timeout, get_gearmand_status, '127.0.0.1',
+                          port, timeout=0.3, cache=self.cache)
+        self.assertTrue(default_timer() - started < 0.5)
+
+    def test_connection_refused(self):
+        port = self.start()
+        self.fake.stop()
+        self.fake = None
+        self.assertRaises(socket.error, get_gearmand_status, '127.0.0.1',
+                          port, cache=self.cache)
+        self.assertRaises(TargetBackoff, get_gearmand_status, '127.0.0.1',
+                          port, cache=self.cache)
+
+
+
+class MainTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.env = dict(os.environ)
+        self.env['NAGIOS_NEGCACHE_DIR'] = os.path.join(self.directory,
+                                                       'negcache')
+        self.fake = None
+
+    def tearDown(self):
+        if self.fake:
+            self.fake.stop()
+        shutil.rmtree(self.directory)
+
+    def run_plugin(self, *args):
+        """Runs the plugin against the fake. Returns (exit_code, output).
+        """
+        cmd = [sys.executable, PLUGIN, '-H', '127.0.0.1',
+               '-p', str(self.fake.port)] + list(args)
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE,
+                                stderr=subprocess.STDOUT, env=self.env)
+        output = proc.communicate()[0].decode('utf-8')
+        return proc.returncode, output
+
+    def test_ok(self):
+        self.fake = FakeGearmand(size=3).start()
+        code, output = self.run_plugin('-q', 'queue2', '-w', '5')
+        self.assertEqual(code, 0)
+        self.assertTrue(output.startswith("OK : "), output)
+
+    def test_timeout_covers_answer(self):
+        # Slower than the default timeout, but well within -t.
+        self.fake = FakeGearmand(latency=0.7).start()
+        code, output = self.run_plugin('-q', 'queue1', '-w', '5', '-t', '5')
+        self.assertEqual(code, 0, output)
+
+    def test_no_answer(self):
+        self.fake = FakeGearmand(latency=0.7).start()
+        code, output = self.run_plugin('-q', 'queue1', '-w', '5')
+        self.assertEqual(code, 3)
+        self.assertTrue(output.startswith("UNKNOWN : No answer ("), output)
+
+
+    def test_passive(self):
+        self.fake = FakeGearmand(size=3).start()
+        command_file = os.path.join(self.directory, 'nagios.cmd')
+        open(command_file, 'w').close()
+        code, output = self.run_plugin('-q', 'queue0,queue2,missing',
+                                       '-w', '1', '--command-file', command_file,
+                                       '--service', 'Jobs 100% %s')
+        self.assertEqual(code, 0, output)
+        self.assertEqual(output,
+            "OK: 3 passive results submitted (1 OK, 1 WARNING, 1 UNKNOWN)\n")
+        fields = [line.split(';')[1:5]
+                  for line in open(command_file).read().splitlines()]
+        self.assertEqual([f[:3] for f in fields], [
+            ['127.0.0.1', 'Jobs 100% queue0', '0'],
+            ['127.0.0.1', 'Jobs 100% queue2', '1'],
+            ['127.0.0.1', 'Jobs 100% missing', '3'],
+        ])
+        self.assertTrue(fields[2][3].startswith("UNKNOWN : Queue missing "))
+
+    def test_passive_failed_connection(self):
+        self.fake = FakeGearmand().start()
+        self.fake.stop()
+        command_file = os.path.join(self.directory, 'nagios.cmd')
+        open(command_file, 'w').close()
+        code, output = self.run_plugin('-q', 'queue0,queue1', '-w', '1',
+                                       '--command-file', command_file,
+                                       '--passive-host', 'gm1')
+        self.assertEqual(code, 0, output)
+        lines = open(command_file).read().splitlines()
+        self.assertEqual(len(lines), 2)
+        for line, queue in zip(lines, ['queue0', 'queue1']):
+            self.assertTrue(";gm1;Gearman queue %s;3;UNKNOWN : Failed "
+                            "connection" % queue in line, line)
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# test_check_zookeeper.py
+"""
+Tests for check_zookeeper.py, against bench/fakes.py. Run with:
+python -m unittest discover
+"""
+
+# Copyright 2026 agent <agent@local>
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import os
+import sys
+import shutil
+import socket
+import tempfile
+import unittest
+import subprocess
+from timeit import default_timer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                'bench'))
+
+from check_zookeeper import ZkClient, check_server
+from nagios_negcache import NegativeCache, TargetBackoff
+from fakes import FakeZookeeper
+
+
+PLUGIN = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                      'check_zookeeper.py')
+
+class ZkClientTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = NegativeCache(os.path.join(self.directory, 'negcache'))
+        self.fake = None
+
+    def tearDown(self):
+        if self.fake:
+            self.fake.stop()
+        shutil.rmtree(self.directory)
+
+    def client(self, timeout=1, **knobs):
+        self.fake = FakeZookeeper(**knobs).start()
+        return ZkClient('127.0.0.1', self.fake.port, timeout, cache=self.cache)
+
+    def test_check_server(self):
+        zk = self.client(state='follower')
+        self.assertEqual(check_server(zk), (0, "zk_server_state: follower"))
+        self.assertEqual(zk.timer.order,
+                         ['dns', 'connect', 'ttfb', 'read', 'parse', 'eval'])
+
+    def test_trickled_answer(self):
+        zk = self.client(size=20, trickle=0.001, chunk=16)
+        self.assertTrue('zk_fake_key_19\t19\n' in zk.cmd('mntr'))
+
+    def test_no_answer(self):
+        zk = self.client(timeout=0.3, latency=1)
+        started = default_timer()
+        self.assertRaises(socket.timeout, zk.cmd, 'ruok')
+        self.assertTrue(default_timer() - started < 0.6)
+        self.assertRaises(TargetBackoff, zk.cmd, 'ruok')
+
+    def test_timeout_covers_whole_read(self):
+        # Answer starts just before the timeout and trickles past it.
+        zk = self.client(timeout=0.3, latency=0.2, size=50, trickle=0.05,
+                         chunk=50)
+        started = default_timer()
+        self.assertRaises(socket.timeout, zk.cmd, 'mntr')
+        self.assertTrue(default_timer() - started < 0.5)
+        self.assertRaises(TargetBackoff, self.cache.check, '127.0.0.1',
+                          self.fake.port)
+
+
+
+
+class MainTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.fake = FakeZookeeper().start()
+
+    def tearDown(self):
+        self.fake.stop()
+        shutil.rmtree(self.directory)
+
+    def test_passive(self):
+        # Nothing listens on 127.0.0.2: one member up, one down.
+        command_file = os.path.join(self.directory, 'nagios.cmd')
+        open(command_file, 'w').close()
+        env = dict(os.environ)
+        env['NAGIOS_NEGCACHE_DIR'] = os.path.join(self.directory, 'negcache')
+        proc = subprocess.Popen([sys.executable, PLUGIN,
+                                 '-H', '127.0.0.1,127.0.0.2',
+                                 '-p', str(self.fake.port),
+                                 '--command-file', command_file],
+                                stdout=subprocess.PIPE,
+                                stderr=subprocess.STDOUT, env=env)
+        output = proc.communicate()[0].decode('utf-8')
+        self.assertEqual(proc.returncode, 0, output)
+        self.assertEqual(output,
+            "OK: 2 passive results submitted (1 OK, 1 CRITICAL)\n")
+        fields = [line.split(';')[1:5]
+                  for line in open(command_file).read().splitlines()]
+        self.assertEqual([f[:3] for f in fields], [
+            ['127.0.0.1', 'Zookeeper', '0'],
+            ['127.0.0.2', 'Zookeeper', '2'],
+        ])
+        self.assertTrue(fields[1][3].startswith("CRITICAL: Can't connect to "
+                                                "127.0.0.2:"), fields[1][3])
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,219 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# test_metrics_exporter.py
+"""
+Tests for metrics_exporter.py, against bench/fakes.py. Run with:
+python -m unittest discover
+"""
+
+# Copyright 2026 agent <agent@local>
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import os
+import sys
+import socket
+import logging
+import unittest
+import threading
+import urllib2
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                'bench'))
+
+from metrics_exporter import Registry, Collector, MetricsHandler, \
+    ThreadingHTTPServer, split_target, format_value, collect_gearmand, \
+    CONTENT_TYPE
+from nagios_timing import PhaseTimer
+from fakes import FakeGearmand
+
+
+class FakeCollector:
+    """Stands for a Collector that already collected 'samples'.
+    """
+
+    def __init__(self, samples):
+        self.samples = samples
+
+
+
+class MalformedGearmand(FakeGearmand):
+    """Gearmand whose status has a short line and a non-numeric one.
+    """
+
+    def answer(self, request):
+        return (b"q1\t1\t0\t2\n"
+                b"short\t1\n"
+                b"q2\tx\t1\t1\n"
+                b"q3\t3\t1\t1\n"
+                b".\n")
+
+
+
+class SplitTargetTest(unittest.TestCase):
+
+    def test_name_only(self):
+        self.assertEqual(split_target('gm1', ':', '4730', 30),
+                         ('gm1', '4730', 30))
+
+    def test_port(self):
+        self.assertEqual(split_target('gm1:4731', ':', '4730', 30),
+                         ('gm1', '4731', 30))
+
+    def test_interval(self):
+        self.assertEqual(split_target('gm1:4731/10', ':', '4730', 30),
+                         ('gm1', '4731', 10.0))
+        self.assertEqual(split_target('gm1/2.5', ':', '4730', 30),
+                         ('gm1', '4730', 2.5))
+
+    def test_coraid(self):
+        self.assertEqual(split_target('0@eth2/300', '@', 'eth0', 30),
+                         ('0', 'eth2', 300.0))
+        self.assertEqual(split_target('1', '@', 'eth0', 30),
+                         ('1', 'eth0', 30))
+
+
+
+class RenderTest(unittest.TestCase):
+
+    def test_empty(self):
+        self.assertEqual(Registry().render(), '# EOF\n')
+
+    def test_render(self):
+        registry = Registry()
+        registry.collectors = [
+            FakeCollector([
+                ('gearmand_queue_jobs', {'queue': 'b', 'target': 'gm1'}, '2'),
+                ('exporter_collect_up', {'collector': 'gearmand'}, 1),
+            ]),
+            FakeCollector([
+                ('gearmand_queue_jobs', {'queue': 'a"\\\n', 'target': 'gm2'}, 5),
+                ('zookeeper_avg_latency', {}, 0.25),
+            ]),
+        ]
+        self.assertEqual(registry.render(),
+            '# TYPE exporter_collect_up gauge\n'
+            '# HELP exporter_collect_up Whether the last collection succeeded\n'
+            'exporter_collect_up{collector="gearmand"} 1.0\n'
+            '# TYPE gearmand_queue_jobs gauge\n'
+            '# HELP gearmand_queue_jobs Jobs in a Gearmand queue\n'
+            'gearmand_queue_jobs{queue="b",target="gm1"} 2.0\n'
+            'gearmand_queue_jobs{queue="a\\"\\\\\\n",target="gm2"} 5.0\n'
+            '# TYPE zookeeper_avg_latency gauge\n'
+            '# HELP zookeeper_avg_latency zookeeper avg latency\n'
+            'zookeeper_avg_latency{} 0.25\n'
+            '# EOF\n')
+
+    def test_special_values(self):
+        self.assertEqual(format_value('nan'), 'NaN')
+        self.assertEqual(format_value(float('inf')), '+Inf')
+        self.assertEqual(format_value('-inf'), '-Inf')
+        self.assertEqual(format_value(0.1), '0.1')
+        self.assertEqual(format_value('7'), '7.0')
+
+
+
+class CollectGearmandTest(unittest.TestCase):
+
+    def setUp(self):
+        self.fake = MalformedGearmand().start()
+        logging.disable(logging.WARNING)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+        self.fake.stop()
+
+    def test_skips_malformed_lines(self):
+        samples = collect_gearmand('127.0.0.1', self.fake.port, PhaseTimer())
+        self.assertEqual(sorted(set([s[1]['queue'] for s in samples])),
+                         ['q1', 'q3'])
+        self.assertTrue(('gearmand_queue_jobs', {'queue': 'q3'}, '3')
+                        in samples)
+
+
+
+class CollectorTest(unittest.TestCase):
+
+    def setUp(self):
+        logging.disable(logging.WARNING)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def collector(self, collect):
+        registry = Registry()
+        collector = Collector(registry, 'gearmand', 'gm1:4730', 30, collect)
+        registry.collectors = [collector]
+        return registry, collector
+
+    def test_collected(self):
+        def collect(timer):
+            timer.add('read', 0.5)
+            return [('gearmand_queue_jobs', {'queue': 'q'}, 3)]
+        registry, collector = self.collector(collect)
+        collector.collect_once()
+        page = registry.page
+        self.assertTrue('gearmand_queue_jobs{queue="q",target="gm1:4730"} 3.0\n'
+                        in page, page)
+        self.assertTrue('exporter_collect_up{collector="gearmand",'
+                        'target="gm1:4730"} 1.0\n' in page, page)
+        self.assertTrue('exporter_collect_phase_seconds{collector="gearmand",'
+                        'phase="read",target="gm1:4730"} 0.5\n' in page, page)
+
+    def test_failed(self):
+        def collect(timer):
+            raise socket.timeout("nothing received in 5s")
+        registry, collector = self.collector(collect)
+        collector.collect_once()
+        page = registry.page
+        self.assertTrue('exporter_collect_up{collector="gearmand",'
+                        'target="gm1:4730"} 0.0\n' in page, page)
+        self.assertFalse('gearmand_queue_jobs' in page)
+        self.assertTrue(page.endswith('# EOF\n'))
+
+
+
+class ScrapeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), MetricsHandler)
+        self.server.registry = Registry()
+        self.server.registry.page = 'up 1.0\n# EOF\n'
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        self.url = 'http://127.0.0.1:%d' % self.server.server_address[1]
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_metrics(self):
+        response = urllib2.urlopen(self.url + '/metrics')
+        self.assertEqual(response.info()['Content-Type'], CONTENT_TYPE)
+        self.assertEqual(response.read(), 'up 1.0\n# EOF\n')
+
+    def test_not_found(self):
+        try:
+            urllib2.urlopen(self.url + '/')
+        except urllib2.HTTPError as err:
+            self.assertEqual(err.code, 404)
+        else:
+            self.fail("no 404")
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# test_nagios_negcache.py
+"""
+Tests for nagios_negcache.py. Run with: python -m unittest discover
+"""
+
+# Copyright 2026 agent <agent@local>
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import os
+import shutil
+import socket
+import tempfile
+import unittest
+
+from nagios_negcache import NegativeCache, TargetBackoff
+
+
+class NegativeCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.base = tempfile.mkdtemp()
+        self.directory = os.path.join(self.base, 'negcache')
+        self.cache = NegativeCache(self.directory, backoff_min=10,
+                                   backoff_max=35)
+
+    def tearDown(self):
+        shutil.rmtree(self.base)
+
+    def test_unknown_target(self):
+        self.assertEqual(self.cache.retry_in('gm1', 4730), 0)
+        self.cache.check('gm1', 4730)
+
+    def test_backoff_doubles(self):
+        waits = []
+        for i in range(4):
+            self.cache.failed('gm1', 4730)
+            waits.append(round(self.cache.retry_in('gm1', 4730)))
+        self.assertEqual(waits, [10, 20, 35, 35])
+        self.assertEqual(self.cache.retry_in('gm2', 4730), 0)
+
+    def test_check_raises(self):
+        self.cache.failed('gm1', 4730)
+        self.assertRaises(TargetBackoff, self.cache.check, 'gm1', 4730)
+        self.assertTrue(issubclass(TargetBackoff, socket.error))
+
+    def test_success_clears(self):
+        self.cache.failed('gm1', 4730)
+        self.cache.succeeded('gm1', 4730)
+        self.assertEqual(self.cache.retry_in('gm1', 4730), 0)
+        self.cache.failed('gm1', 4730)
+        self.assertEqual(round(self.cache.retry_in('gm1', 4730)), 10)
+
+    def test_private_directory(self):
+        self.cache.failed('gm1', 4730)
+        self.assertEqual(os.stat(self.directory).st_mode & 0o777, 0o700)
+        self.assertEqual(os.listdir(self.directory), ['gm1_4730'])
+
+    def test_shared_directory_ignored(self):
+        self.cache.failed('gm1', 4730)
+        os.chmod(self.directory, 0o777)
+        self.assertEqual(self.cache.retry_in('gm1', 4730), 0)
+        self.cache.failed('gm2', 4730)
+        self.assertEqual(os.listdir(self.directory), ['gm1_4730'])
+
+    def test_symlink_ignored(self):
+        self.cache.failed('gm1', 4730)
+        link = os.path.join(self.base, 'link')
+        os.symlink(self.directory, link)
+        self.assertEqual(NegativeCache(link).retry_in('gm1', 4730), 0)
+
+    def test_unusable_directory(self):
+        cache = NegativeCache(os.path.join(self.base, 'missing', 'negcache'))
+        cache.failed('gm1', 4730)
+        self.assertEqual(cache.retry_in('gm1', 4730), 0)
+
+
+
+if __name__ == '__main__':
+    unittest.main()
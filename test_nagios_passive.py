@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# test_nagios_passive.py
+"""
+Tests for nagios_passive.py. Run with: python -m unittest discover
+"""
+
+# Copyright 2026 agent <agent@local>
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import os
+import select
+import shutil
+import tempfile
+import unittest
+
+from nagios_passive import PassiveResults, format_command, \
+    format_checkresult, escape_output, clean_field, pipe_chunks
+
+
+class FormatTest(unittest.TestCase):
+
+    def test_command(self):
+        self.assertEqual(
+            format_command('gm1', 'Gearman queue q', 1, 'WARNING : 7 jobs', 1000),
+            "[1000] PROCESS_SERVICE_CHECK_RESULT;gm1;Gearman queue q;1;"
+            "WARNING : 7 jobs\n")
+
+    def test_checkresult(self):
+        block = format_checkresult('gm1', 'q', 2, 'CRITICAL', 1000)
+        self.assertTrue("host_name=gm1\nservice_description=q\n" in block)
+        self.assertTrue("return_code=2\noutput=CRITICAL\n" in block)
+        self.assertTrue(block.endswith("\n\n"))
+
+    def test_multiline_output(self):
+        self.assertEqual(escape_output(" line 1\r\nline 2\n"),
+                         "line 1\\nline 2")
+
+    def test_clean_field(self):
+        self.assertEqual(clean_field("a\r\nb;c"), "a  b c")
+
+
+
+class PassiveResultsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_injection(self):
+        results = PassiveResults('gm1\n[0] RESTART_PROGRAM', 'queue %s')
+        results.add('q;1\nx', 0, 'OK')
+        service = results.results[0][1]
+        command = format_command(*results.results[0])
+        self.assertEqual(command.count('\n'), 1)
+        self.assertEqual(command.count(';'), 4)
+        self.assertEqual(service, 'queue q 1 x')
+
+    def test_service_with_percent(self):
+        results = PassiveResults('gm1', 'Disk 90% %s')
+        results.add('sda', 0, 'OK')
+        results.add(1, 0, 'OK')
+        self.assertEqual([r[1] for r in results.results],
+                         ['Disk 90% sda', 'Disk 90% 1'])
+
+    def test_service_without_target(self):
+        results = PassiveResults('zk1', 'Zookeeper')
+        results.add('zk1', 0, 'OK')
+        self.assertEqual(results.results[0][1], 'Zookeeper')
+
+    def test_perfdata(self):
+        results = PassiveResults('gm1', 'queue %s')
+        results.add('q', 0, 'OK', perfdata='jobs=1')
+        self.assertEqual(results.results[0][3], 'OK | jobs=1')
+
+    def test_summary(self):
+        results = PassiveResults('gm1', 'queue %s')
+        for code in [0, 0, 2]:
+            results.add('q', code, 'output')
+        self.assertEqual(results.summary(),
+                         "3 passive results submitted (2 OK, 1 CRITICAL)")
+
+    def test_command_file(self):
+        path = os.path.join(self.directory, 'nagios.cmd')
+        open(path, 'w').close()
+        results = PassiveResults('gm1', 'queue %s', command_file=path)
+        for i in range(3):
+            results.add('q%d' % i, 0, 'OK')
+        self.assertEqual(results.submit(), 3)
+        lines = open(path).read().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[2].endswith(';gm1;queue q2;0;OK'))
+
+    def test_spool(self):
+        results = PassiveResults('gm1', 'queue %s', spool_dir=self.directory)
+        results.add('q', 0, 'OK')
+        results.submit()
+        names = sorted(os.listdir(self.directory))
+        self.assertEqual(len(names), 2)
+        self.assertEqual(names[0] + '.ok', names[1])
+        self.assertEqual(len(names[0]), 7)
+        self.assertTrue(names[0].startswith('c'))
+
+
+
+class PipeChunksTest(unittest.TestCase):
+
+    def test_small(self):
+        self.assertEqual(list(pipe_chunks([b'a\n', b'b\n'])), [b'a\nb\n'])
+
+    def test_split_on_lines(self):
+        line = b'x' * (select.PIPE_BUF // 3 + 1) + b'\n'
+        chunks = list(pipe_chunks([line] * 5))
+        self.assertEqual(b''.join(chunks), line * 5)
+        for chunk in chunks:
+            self.assertTrue(len(chunk) <= select.PIPE_BUF)
+            self.assertEqual(len(chunk) % len(line), 0)
+
+    def test_long_line(self):
+        # Can't be atomic, but must not be split or dropped.
+        line = b'x' * (select.PIPE_BUF * 2)
+        self.assertEqual(list(pipe_chunks([b'a\n', line])), [b'a\n', line])
+
+
+
+if __name__ == '__main__':
+    unittest.main()
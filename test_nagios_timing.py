@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# test_nagios_timing.py
+"""
+Tests for nagios_timing.py. Run with: python -m unittest discover
+"""
+
+# Copyright 2026 agent <agent@local>
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import os
+import sys
+import socket
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                'bench'))
+
+import nagios_timing
+from nagios_timing import PhaseTimer, connect_telnet
+from fakes import FakeGearmand
+
+
+class PhaseTimerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.now = [100.0]
+        self.real_timer = nagios_timing.default_timer
+        nagios_timing.default_timer = lambda: self.now[0]
+
+    def tearDown(self):
+        nagios_timing.default_timer = self.real_timer
+
+    def test_laps(self):
+        timer = PhaseTimer()
+        self.now[0] += 0.002
+        timer.lap('dns')
+        self.now[0] += 0.010
+        timer.lap('connect')
+        self.assertEqual(timer.metrics(),
+                         [('dns_ms', 2.0), ('connect_ms', 10.0)])
+
+    def test_repeated_phases_add_up(self):
+        timer = PhaseTimer()
+        for i in range(3):
+            self.now[0] += 0.001
+            timer.lap('read')
+        timer.add('parse', 0.0005)
+        self.assertEqual(timer.perfdata(), "read_ms=3.0ms parse_ms=0.5ms")
+
+    def test_mark(self):
+        timer = PhaseTimer()
+        self.now[0] += 5
+        timer.mark()
+        self.now[0] += 0.001
+        timer.lap('read')
+        self.assertEqual(timer.metrics(), [('read_ms', 1.0)])
+
+
+
+class ConnectTelnetTest(unittest.TestCase):
+
+    def setUp(self):
+        self.fake = FakeGearmand().start()
+        self.real_getaddrinfo = socket.getaddrinfo
+
+    def tearDown(self):
+        socket.getaddrinfo = self.real_getaddrinfo
+        self.fake.stop()
+
+    def test_connect(self):
+        timer = PhaseTimer()
+        client = connect_telnet('127.0.0.1', self.fake.port, 1, timer)
+        client.close()
+        self.assertEqual(timer.order, ['dns', 'connect'])
+
+    def resolve(self, *addresses):
+        """Makes 'gm1' resolve to 'addresses', in that order.
+        """
+        def getaddrinfo(host, port, *args):
+            if host != 'gm1':
+                return self.real_getaddrinfo(host, port, *args)
+            return [(socket.AF_INET, socket.SOCK_STREAM, 6, '', (address, port))
+                    for address in addresses]
+        socket.getaddrinfo = getaddrinfo
+
+    def test_tries_every_address(self):
+        # Nothing listens on 127.0.0.2: refused, then the fake answers.
+        self.resolve('127.0.0.2', '127.0.0.1')
+        client = connect_telnet('gm1', self.fake.port, 1, PhaseTimer())
+        self.assertEqual(client.get_socket().getpeername()[0], '127.0.0.1')
+        client.close()
+
+    def test_all_addresses_fail(self):
+        self.resolve('127.0.0.2', '127.0.0.3')
+        timer = PhaseTimer()
+        self.assertRaises(socket.error, connect_telnet, 'gm1', self.fake.port,
+                          1, timer)
+        self.assertEqual(timer.order, ['dns', 'connect'])
+
+
+
+if __name__ == '__main__':
+    unittest.main()